@@ -4,57 +4,121 @@ Permite configurar e controlar o sistema via CLI
 """
 
 import argparse
+import functools
+import os
+import shutil
 import sys
-import json
-import time
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List
 
-from core.db_manager import DatabaseManager
-from core.monitor_service import MonitorService
-from utils.logger import get_logger
+__version__ = '1.0.0'
+
+# Quantidade de linhas acumuladas antes de cada escrita no stdout
+_FLUSH_EVERY = 256
+
+# Linhas separadoras
+_SEP_DASH_40 = "-" * 40
+_SEP_DASH_50 = "-" * 50
+_SEP_DASH_65 = "-" * 65
+_SEP_DASH_75 = "-" * 75
+_SEP_EQ_50 = "=" * 50
+
+# Formatos das linhas das listagens
+_CITY_ROW_FMT = "{id:<4} {status:<8} {name:<25} {slug:<20}".format
+_KW_ROW_FMT = "{id:<4} {status:<8} {term:<20} {interval:<10} {checks:<12} {found:<12}".format
+
+def _flush_lines(lines: List[str]):
+    """Escrever as linhas acumuladas com uma única chamada e esvaziar a lista"""
+    if not lines:
+        return
+    
+    text = '\n'.join(lines) + '\n'
+    lines.clear()
+    
+    # Codificar o bloco inteiro de uma vez e escrever direto no buffer binário;
+    # streams sem buffer (ex.: StringIO em testes) recebem texto
+    stdout = sys.stdout
+    buffer = getattr(stdout, 'buffer', None)
+    if buffer is None:
+        stdout.write(text)
+        return
+    
+    stdout.flush()
+    buffer.write(text.encode(stdout.encoding or 'utf-8', stdout.errors or 'strict'))
 
 class CLI:
     """Interface de linha de comando"""
     
     def __init__(self):
-        self.db = DatabaseManager()
-        self.logger = get_logger("CLI", self.db)
-        self.monitor = MonitorService()
+        # Componentes criados sob demanda (evita importar Selenium em --help)
+        self.db = None
+        self.monitor = None
+        self._scraper = None
+    
+    def _ensure_db(self):
+        """Criar gerenciador do banco na primeira utilização"""
+        if self.db is None:
+            from core.db_manager import DatabaseManager
+            self.db = DatabaseManager()
+        return self.db
+    
+    @functools.cached_property
+    def logger(self):
+        """Logger da CLI, criado apenas pelos comandos que registram logs"""
+        from utils.logger import get_logger
+        return get_logger("CLI", self._ensure_db())
+    
+    def _ensure_monitor(self):
+        """Criar serviço de monitoramento na primeira utilização"""
+        if self.monitor is None:
+            from core.monitor_service import MonitorService
+            self.monitor = MonitorService()
+        return self.monitor
+    
+    def _get_scraper(self):
+        """Obter o scraper do processo, criado uma única vez
+        
+        O driver do navegador é reaproveitado entre chamadas e fechado
+        apenas no encerramento do processo.
+        """
+        if self._scraper is None:
+            from core.scraper_engine import ScraperEngine
+            self._scraper = ScraperEngine(self._ensure_db(), self.logger)
+        return self._scraper
     
     def cmd_init(self, args):
         """Inicializar o sistema"""
         print("🚀 Inicializando sistema de monitoramento...")
         
         try:
-            # Verificar se banco já existe
-            info = self.db.get_database_info()
+            self._ensure_db()
+            
+            # Contadores e amostras em uma única conexão
+            info = self.db.get_init_summary()
+            counts = info['counts']
             
             print(f"✅ Banco de dados inicializado")
             print(f"   📁 Localização: {self.db.db_path}")
-            print(f"   📊 Cidades: {info['cities_count']}")
-            print(f"   🔍 Palavras-chave: {info['keywords_count']}")
-            print(f"   📝 Anúncios: {info['listings_count']}")
+            print(f"   📊 Cidades: {counts['cities']}")
+            print(f"   🔍 Palavras-chave: {counts['keywords']}")
+            print(f"   📝 Anúncios: {counts['listings']}")
             
             # Mostrar cidades padrão
-            cities = self.db.get_cities()
-            print(f"\n🏙️  Cidades configuradas ({len(cities)}):")
-            for city in cities[:5]:
+            print(f"\n🏙️  Cidades configuradas ({counts['cities']}):")
+            for city in info['cities']:
                 status = "✅" if city['active'] else "❌"
                 print(f"   {status} {city['name']} ({city['facebook_slug']})")
             
-            if len(cities) > 5:
-                print(f"   ... e mais {len(cities) - 5} cidades")
+            if counts['cities'] > 5:
+                print(f"   ... e mais {counts['cities'] - 5} cidades")
             
             # Mostrar palavras-chave padrão
-            keywords = self.db.get_keywords()
-            print(f"\n🔍 Palavras-chave configuradas ({len(keywords)}):")
-            for kw in keywords[:5]:
+            print(f"\n🔍 Palavras-chave configuradas ({counts['keywords']}):")
+            for kw in info['keywords']:
                 status = "✅" if kw['active'] else "❌"
                 print(f"   {status} {kw['term']} (intervalo: {kw['check_interval']}s)")
             
-            if len(keywords) > 5:
-                print(f"   ... e mais {len(keywords) - 5} palavras-chave")
+            if counts['keywords'] > 5:
+                print(f"   ... e mais {counts['keywords'] - 5} palavras-chave")
             
             print(f"\n💡 Use 'python main.py --help' para ver todos os comandos")
             
@@ -67,6 +131,7 @@ class CLI:
     def cmd_city_add(self, args):
         """Adicionar nova cidade"""
         try:
+            self._ensure_db()
             city_id = self.db.add_city(args.name, args.slug, args.active)
             print(f"✅ Cidade '{args.name}' adicionada (ID: {city_id})")
             return 0
@@ -76,28 +141,35 @@ class CLI:
     
     def cmd_city_list(self, args):
         """Listar cidades"""
-        cities = self.db.get_cities(active_only=not args.all)
+        self._ensure_db()
+        total = self.db.count_cities(active_only=not args.all)
         
-        if not cities:
+        if not total:
             print("📭 Nenhuma cidade encontrada")
             return 0
         
-        print(f"🏙️  Cidades {'ativas' if not args.all else 'cadastradas'} ({len(cities)}):")
+        print(f"🏙️  Cidades {'ativas' if not args.all else 'cadastradas'} ({total}):")
         print(f"{'ID':<4} {'Status':<8} {'Nome':<25} {'Slug Facebook':<20}")
-        print("-" * 65)
+        print(_SEP_DASH_65)
         
-        for city in cities:
-            status = "✅ Ativa" if city['active'] else "❌ Inativa"
-            print(f"{city['id']:<4} {status:<8} {city['name']:<25} {city['facebook_slug']:<20}")
+        lines = []
+        fmt = _CITY_ROW_FMT
+        for city_id, name, slug, active in self.db.iter_cities(active_only=not args.all):
+            status = "✅ Ativa" if active else "❌ Inativa"
+            lines.append(fmt(id=city_id, status=status, name=name, slug=slug))
+            if len(lines) >= _FLUSH_EVERY:
+                _flush_lines(lines)
+        _flush_lines(lines)
         
         return 0
     
     def cmd_city_toggle(self, args):
         """Ativar/desativar cidade"""
         try:
+            self._ensure_db()
+            
             # Buscar cidade
-            cities = self.db.get_cities(active_only=False)
-            city = next((c for c in cities if c['facebook_slug'] == args.slug), None)
+            city = self.db.get_city_by_slug(args.slug)
             
             if not city:
                 print(f"❌ Cidade '{args.slug}' não encontrada")
@@ -117,6 +189,7 @@ class CLI:
     def cmd_keyword_add(self, args):
         """Adicionar nova palavra-chave"""
         try:
+            self._ensure_db()
             keyword_id = self.db.add_keyword(args.term, args.interval, args.active)
             print(f"✅ Palavra-chave '{args.term}' adicionada (ID: {keyword_id})")
             print(f"   ⏱️  Intervalo: {args.interval} segundos")
@@ -127,28 +200,33 @@ class CLI:
     
     def cmd_keyword_list(self, args):
         """Listar palavras-chave"""
-        keywords = self.db.get_keywords(active_only=not args.all)
+        self._ensure_db()
+        total = self.db.count_keywords(active_only=not args.all)
         
-        if not keywords:
+        if not total:
             print("📭 Nenhuma palavra-chave encontrada")
             return 0
         
-        print(f"🔍 Palavras-chave {'ativas' if not args.all else 'cadastradas'} ({len(keywords)}):")
+        print(f"🔍 Palavras-chave {'ativas' if not args.all else 'cadastradas'} ({total}):")
         print(f"{'ID':<4} {'Status':<8} {'Termo':<20} {'Intervalo':<10} {'Verificações':<12} {'Encontrados':<12}")
-        print("-" * 75)
+        print(_SEP_DASH_75)
         
-        for kw in keywords:
-            status = "✅ Ativa" if kw['active'] else "❌ Inativa"
-            last_check = "Nunca" if not kw['last_check'] else kw['last_check'][:16]
-            
-            print(f"{kw['id']:<4} {status:<8} {kw['term']:<20} {kw['check_interval']:<10} "
-                  f"{kw['total_checks']:<12} {kw['total_found']:<12}")
+        lines = []
+        fmt = _KW_ROW_FMT
+        for kw_id, term, interval, checks, found, active in self.db.iter_keywords(active_only=not args.all):
+            status = "✅ Ativa" if active else "❌ Inativa"
+            lines.append(fmt(id=kw_id, status=status, term=term, interval=interval,
+                             checks=checks, found=found))
+            if len(lines) >= _FLUSH_EVERY:
+                _flush_lines(lines)
+        _flush_lines(lines)
         
         return 0
     
     def cmd_keyword_update(self, args):
         """Atualizar palavra-chave"""
         try:
+            self._ensure_db()
             if args.interval:
                 self.db.update_keyword_interval(args.keyword_id, args.interval)
                 print(f"✅ Intervalo da palavra-chave ID {args.keyword_id} atualizado para {args.interval}s")
@@ -163,6 +241,8 @@ class CLI:
         print("🚀 Iniciando monitoramento do Facebook Marketplace...")
         
         try:
+            self._ensure_db()
+            
             # Verificar configurações
             keywords = self.db.get_keywords(active_only=True)
             cities = self.db.get_cities(active_only=True)
@@ -180,21 +260,28 @@ class CLI:
             print(f"   🏙️  {len(cities)} cidades ativas")
             print(f"   📱 Notificações: {'habilitadas' if self.db.get_config('notification_enabled') else 'desabilitadas'}")
             
-            # Configurar modo visual se solicitado
+            # Configurar modo visual se solicitado (gravado numa única transação)
+            updates = {}
             if args.visual:
-                self.db.set_config('headless_browser', False)
+                updates['headless_browser'] = False
                 print("👁️  Modo visual ativado - navegador será visível")
             
             if args.show_logs:
-                self.db.set_config('show_browser_logs', True)
+                updates['show_browser_logs'] = True
                 print("📋 Modo debug ativado - logs do navegador serão exibidos")
             
+            if updates:
+                self.db.set_configs(updates)
+            
             if args.daemon:
                 print("🔄 Executando em modo daemon...")
             else:
                 print("⚠️  Pressione Ctrl+C para parar")
             
-            print("-" * 50)
+            print(_SEP_DASH_50)
+            
+            # Criado após gravar as flags para que o scraper as utilize
+            self._ensure_monitor()
             
             # Iniciar monitoramento
             self.monitor.start()
@@ -211,11 +298,12 @@ class CLI:
     def cmd_status(self, args):
         """Mostrar status do sistema"""
         try:
+            self._ensure_monitor()
             status = self.monitor.get_status()
             
             # Cabeçalho
             print("📊 STATUS DO SISTEMA")
-            print("=" * 50)
+            print(_SEP_EQ_50)
             
             # Status básico
             running_status = "🟢 Executando" if status['running'] else "🔴 Parado"
@@ -259,25 +347,28 @@ class CLI:
     def cmd_report(self, args):
         """Gerar relatório"""
         try:
+            self._ensure_db()
             hours = args.hours
             print(f"📋 RELATÓRIO - Últimas {hours} horas")
-            print("=" * 50)
+            print(_SEP_EQ_50)
             
-            # Anúncios recentes
-            recent_listings = self.db.get_recent_listings(hours, limit=50)
+            # Anúncios recentes (apenas os exibidos)
+            recent_listings = self.db.get_recent_listings(hours, limit=10)
             
             if recent_listings:
-                print(f"🆕 Anúncios encontrados: {len(recent_listings)}")
+                print(f"🆕 Anúncios encontrados: {self.db.count_recent_listings(hours)}")
                 print("\nÚltimos 10 anúncios:")
                 
-                for i, listing in enumerate(recent_listings[:10]):
+                lines = []
+                for i, listing in enumerate(recent_listings):
                     found_time = listing['found_at'][:16]  # YYYY-MM-DD HH:MM
                     title = listing['title'][:40] + "..." if len(listing['title']) > 40 else listing['title']
                     price = listing['price'] or 'Sem preço'
                     keyword = listing['keyword_term'] or 'N/A'
                     
-                    print(f"   {i+1:2d}. [{found_time}] {title}")
-                    print(f"       💰 {price} | 🔍 {keyword}")
+                    lines.append(f"   {i+1:2d}. [{found_time}] {title}")
+                    lines.append(f"       💰 {price} | 🔍 {keyword}")
+                _flush_lines(lines)
             else:
                 print("📭 Nenhum anúncio encontrado no período")
             
@@ -297,11 +388,13 @@ class CLI:
     def cmd_config(self, args):
         """Gerenciar configurações"""
         try:
+            self._ensure_db()
+            
             if args.list:
                 # Listar configurações
                 config = self.db.get_all_config()
                 print("⚙️  Configurações do sistema:")
-                print("-" * 40)
+                print(_SEP_DASH_40)
                 
                 for key, value in config.items():
                     print(f"{key:<25}: {value}")
@@ -327,6 +420,7 @@ class CLI:
         """Testar uma busca específica"""
         try:
             print(f"🧪 Testando busca: '{args.keyword}' em {args.city}")
+            self._ensure_db()
             
             # Buscar cidade
             city = self.db.get_city_by_slug(args.city)
@@ -335,8 +429,7 @@ class CLI:
                 return 1
             
             # Buscar ou criar palavra-chave temporária
-            keywords = self.db.get_keywords(active_only=False)
-            keyword = next((k for k in keywords if k['term'] == args.keyword), None)
+            keyword = self.db.get_keyword_by_term(args.keyword)
             
             if not keyword:
                 print(f"⚠️  Palavra-chave '{args.keyword}' não encontrada, criando temporariamente...")
@@ -346,8 +439,7 @@ class CLI:
             # Executar teste
             print("🔍 Executando busca...")
             
-            from core.scraper_engine import ScraperEngine
-            scraper = ScraperEngine(self.db, self.logger)
+            scraper = self._get_scraper()
             
             result = scraper.check_keyword_city_combination(keyword, city)
             
@@ -361,21 +453,13 @@ class CLI:
             if result.get('error_message'):
                 print(f"   Erro: {result['error_message']}")
             
-            # Limpar driver
-            scraper.close_driver()
-            
             return 0 if result['success'] else 1
             
         except Exception as e:
             print(f"❌ Erro no teste: {e}")
             return 1
 
-def create_parser():
-    """Criar parser de argumentos"""
-    parser = argparse.ArgumentParser(
-        description='Sistema de Monitoramento do Facebook Marketplace',
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
+_EPILOG = """
 Exemplos de uso:
   python main.py init                           # Inicializar sistema
   python main.py city add "São Paulo" saopaulo # Adicionar cidade
@@ -383,16 +467,70 @@ Exemplos de uso:
   python main.py start                          # Iniciar monitoramento
   python main.py status                         # Ver status
   python main.py report --hours 24             # Relatório 24h
-        """
-    )
-    
-    subparsers = parser.add_subparsers(dest='command', help='Comandos disponíveis')
-    
-    # Comando init
-    subparsers.add_parser('init', help='Inicializar o sistema')
-    
-    # Comandos de cidade
-    city_parser = subparsers.add_parser('city', help='Gerenciar cidades')
+"""
+
+_DESCRIPTION = 'Sistema de Monitoramento do Facebook Marketplace'
+_COMMANDS_HELP = 'Comandos disponíveis'
+
+# Subcomandos na ordem exibida pelo --help
+_SUBCOMMAND_HELP = {
+    'init': 'Inicializar o sistema',
+    'city': 'Gerenciar cidades',
+    'keyword': 'Gerenciar palavras-chave',
+    'start': 'Iniciar monitoramento',
+    'status': 'Mostrar status do sistema',
+    'report': 'Gerar relatório',
+    'config': 'Gerenciar configurações',
+    'test': 'Testar busca específica'
+}
+
+@functools.lru_cache(maxsize=None)
+def _static_help() -> str:
+    """
+    Ajuda de nível superior sem construir o argparse
+    
+    Montada a partir de _SUBCOMMAND_HELP com o layout do HelpFormatter
+    (coluna de ajuda 24, quebra do usage pela largura do terminal). Em
+    terminais estreitos, onde o argparse quebraria as linhas, usa o próprio
+    argparse.
+    """
+    prog = os.path.basename(sys.argv[0])
+    choices = "{" + ",".join(_SUBCOMMAND_HELP) + "}"
+    width = shutil.get_terminal_size().columns - 2
+    
+    usage = [f"usage: {prog} [-h] [--version] {choices} ..."]
+    if len(usage[0]) > width:
+        indent = " " * len(f"usage: {prog} ")
+        usage = [f"usage: {prog} [-h] [--version]", f"{indent}{choices} ..."]
+    
+    options_title = 'options' if sys.version_info >= (3, 10) else 'optional arguments'
+    lines = [
+        *usage,
+        "",
+        _DESCRIPTION,
+        "",
+        "positional arguments:",
+        f"  {choices}",
+        f"{'':24}{_COMMANDS_HELP}",
+    ]
+    lines.extend(f"    {name:<18}  {help_text}" for name, help_text in _SUBCOMMAND_HELP.items())
+    lines.extend([
+        "",
+        f"{options_title}:",
+        f"  {'-h, --help':<20}  show this help message and exit",
+        f"  {'--version':<20}  show program's version number and exit",
+    ])
+    if max(map(len, lines)) > width:
+        return create_parser(None).format_help()
+    return "\n".join(lines) + "\n" + _EPILOG
+
+def _build_init_parser(subparsers):
+    """Comando init"""
+    subparsers.add_parser('init', help=_SUBCOMMAND_HELP['init'])
+
+def _build_city_parser(subparsers):
+    """Comandos de cidade"""
+    city_parser = subparsers.add_parser('city', help=_SUBCOMMAND_HELP['city'])
     city_subparsers = city_parser.add_subparsers(dest='city_action')
     
     city_add = city_subparsers.add_parser('add', help='Adicionar cidade')
@@ -405,9 +543,10 @@ Exemplos de uso:
     
     city_toggle = city_subparsers.add_parser('toggle', help='Ativar/desativar cidade')
     city_toggle.add_argument('slug', help='Slug da cidade')
-    
-    # Comandos de palavra-chave
-    kw_parser = subparsers.add_parser('keyword', help='Gerenciar palavras-chave')
+
+def _build_keyword_parser(subparsers):
+    """Comandos de palavra-chave"""
+    kw_parser = subparsers.add_parser('keyword', help=_SUBCOMMAND_HELP['keyword'])
     kw_subparsers = kw_parser.add_subparsers(dest='keyword_action')
     
     kw_add = kw_subparsers.add_parser('add', help='Adicionar palavra-chave')
@@ -421,57 +560,105 @@ Exemplos de uso:
     kw_update = kw_subparsers.add_parser('update', help='Atualizar palavra-chave')
     kw_update.add_argument('keyword_id', type=int, help='ID da palavra-chave')
     kw_update.add_argument('--interval', type=int, help='Novo intervalo')
-    
-    # Comando start
-    start_parser = subparsers.add_parser('start', help='Iniciar monitoramento')
+
+def _build_start_parser(subparsers):
+    """Comando start"""
+    start_parser = subparsers.add_parser('start', help=_SUBCOMMAND_HELP['start'])
     start_parser.add_argument('--daemon', action='store_true', help='Executar em background')
     start_parser.add_argument('--visual', action='store_true', help='Executar com navegador visível (para debug)')
     start_parser.add_argument('--show-logs', action='store_true', help='Mostrar logs do navegador')
-    
-    # Comando status
-    subparsers.add_parser('status', help='Mostrar status do sistema')
-    
-    # Comando report
-    report_parser = subparsers.add_parser('report', help='Gerar relatório')
+
+def _build_status_parser(subparsers):
+    """Comando status"""
+    subparsers.add_parser('status', help=_SUBCOMMAND_HELP['status'])
+
+def _build_report_parser(subparsers):
+    """Comando report"""
+    report_parser = subparsers.add_parser('report', help=_SUBCOMMAND_HELP['report'])
     report_parser.add_argument('--hours', type=int, default=24, help='Período em horas')
-    
-    # Comando config
-    config_parser = subparsers.add_parser('config', help='Gerenciar configurações')
+
+def _build_config_parser(subparsers):
+    """Comando config"""
+    config_parser = subparsers.add_parser('config', help=_SUBCOMMAND_HELP['config'])
     config_group = config_parser.add_mutually_exclusive_group(required=True)
     config_group.add_argument('--list', action='store_true', help='Listar configurações')
     config_group.add_argument('--set', nargs=2, metavar=('KEY', 'VALUE'), help='Definir configuração')
     config_group.add_argument('--get', help='Obter configuração')
-    
-    # Comando test
-    test_parser = subparsers.add_parser('test', help='Testar busca específica')
+
+def _build_test_parser(subparsers):
+    """Comando test"""
+    test_parser = subparsers.add_parser('test', help=_SUBCOMMAND_HELP['test'])
     test_parser.add_argument('keyword', help='Palavra-chave para testar')
     test_parser.add_argument('city', help='Slug da cidade')
+
+_PARSER_BUILDERS = {
+    'init': _build_init_parser,
+    'city': _build_city_parser,
+    'keyword': _build_keyword_parser,
+    'start': _build_start_parser,
+    'status': _build_status_parser,
+    'report': _build_report_parser,
+    'config': _build_config_parser,
+    'test': _build_test_parser
+}
+
+# Comandos sem subações, despachados para CLI.cmd_<nome>
+_SIMPLE_COMMANDS = frozenset({'init', 'start', 'status', 'report', 'config', 'test'})
+
+def _detect_command() -> str:
+    """Identificar o subcomando invocado a partir de sys.argv"""
+    return sys.argv[1] if len(sys.argv) > 1 else None
+
+@functools.lru_cache(maxsize=None)
+def create_parser(command: str = None):
+    """
+    Criar parser de argumentos
+    
+    Apenas o subcomando informado recebe seus argumentos; os demais são
+    registrados só com nome e ajuda, o suficiente para o --help e para
+    as mensagens de erro do argparse. O parser de cada subcomando é
+    construído uma única vez por processo.
+    """
+    parser = argparse.ArgumentParser(
+        description=_DESCRIPTION,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=_EPILOG
+    )
+    
+    parser.add_argument('--version', action='version', version=__version__)
+    
+    subparsers = parser.add_subparsers(dest='command', help=_COMMANDS_HELP)
+    
+    for name, help_text in _SUBCOMMAND_HELP.items():
+        if name == command:
+            _PARSER_BUILDERS[name](subparsers)
+        else:
+            subparsers.add_parser(name, help=help_text)
     
     return parser
 
 def main():
     """Função principal"""
-    parser = create_parser()
+    command = _detect_command()
+    
+    # Caminhos sem trabalho: respondem sem montar o argparse
+    if command in (None, '-h', '--help'):
+        sys.stdout.write(_static_help())
+        return 1 if command is None else 0
+    if command == '--version':
+        print(__version__)
+        return 0
+    
+    parser = create_parser(command)
     args = parser.parse_args()
     
     if not args.command:
         parser.print_help()
         return 1
     
-    cli = CLI()
-    
-    # Mapear comandos para métodos
-    command_map = {
-        'init': cli.cmd_init,
-        'start': cli.cmd_start,
-        'status': cli.cmd_status,
-        'report': cli.cmd_report,
-        'config': cli.cmd_config,
-        'test': cli.cmd_test
-    }
-    
-    # Comandos compostos
+    # Comandos compostos (CLI só é criado no ramo executado)
     if args.command == 'city':
+        cli = CLI()
         if args.city_action == 'add':
             return cli.cmd_city_add(args)
         elif args.city_action == 'list':
@@ -480,6 +667,7 @@ def main():
             return cli.cmd_city_toggle(args)
     
     elif args.command == 'keyword':
+        cli = CLI()
         if args.keyword_action == 'add':
             return cli.cmd_keyword_add(args)
         elif args.keyword_action == 'list':
@@ -488,8 +676,8 @@ def main():
             return cli.cmd_keyword_update(args)
     
     # Comandos simples
-    elif args.command in command_map:
-        return command_map[args.command](args)
+    elif args.command in _SIMPLE_COMMANDS:
+        return getattr(CLI(), 'cmd_' + args.command)(args)
     
     else:
         print(f"❌ Comando '{args.command}' não implementado")
@@ -1,6 +1,7 @@
 -- Schema do banco de dados SQLite para monitoramento do Facebook Marketplace
 -- Versão: 1.0
 -- Data: 2025-08-30
+-- Aplicado apenas quando PRAGMA user_version difere de SCHEMA_VERSION (core/db_manager.py)
 
 -- Tabela de configurações gerais do sistema
 CREATE TABLE IF NOT EXISTS config (
@@ -29,6 +30,7 @@ CREATE TABLE IF NOT EXISTS keywords (
     active BOOLEAN DEFAULT 1,
     check_interval INTEGER DEFAULT 120, -- segundos entre verificações
     last_check DATETIME,
+    next_check_at DATETIME, -- last_check + check_interval (NULL = verificar já)
     total_checks INTEGER DEFAULT 0,
     total_found INTEGER DEFAULT 0,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
@@ -93,14 +95,18 @@ CREATE TABLE IF NOT EXISTS execution_stats (
 );
 
 -- Índices para otimização
-CREATE INDEX IF NOT EXISTS idx_listings_facebook_id ON listings(facebook_id);
+-- (facebook_id, facebook_slug e config.key já têm o índice implícito do UNIQUE)
+DROP INDEX IF EXISTS idx_listings_facebook_id;
 CREATE INDEX IF NOT EXISTS idx_listings_found_at ON listings(found_at);
+CREATE INDEX IF NOT EXISTS idx_listings_unnotified ON listings(found_at) WHERE notified = 0;
 CREATE INDEX IF NOT EXISTS idx_listings_city_keyword ON listings(city_id, keyword_id);
 CREATE INDEX IF NOT EXISTS idx_keywords_active ON keywords(active);
+CREATE INDEX IF NOT EXISTS idx_keywords_term ON keywords(term);
 CREATE INDEX IF NOT EXISTS idx_keywords_last_check ON keywords(last_check);
 CREATE INDEX IF NOT EXISTS idx_cities_active ON cities(active);
 CREATE INDEX IF NOT EXISTS idx_system_logs_level ON system_logs(level);
 CREATE INDEX IF NOT EXISTS idx_system_logs_created_at ON system_logs(created_at);
+CREATE INDEX IF NOT EXISTS idx_execution_stats_executed_at ON execution_stats(executed_at);
 
 -- Triggers para atualizar updated_at automaticamente
 CREATE TRIGGER IF NOT EXISTS update_config_timestamp 
@@ -131,6 +137,7 @@ INSERT OR IGNORE INTO config (key, value, description) VALUES
 ('log_level', 'INFO', 'Nível de log do sistema'),
 ('headless_browser', 'true', 'Executar navegador em modo headless'),
 ('max_listings_per_check', '50', 'Máximo de anúncios para processar por verificação'),
+('max_browser_instances', '3', 'Máximo de navegadores simultâneos'),
 ('cleanup_logs_days', '30', 'Dias para manter logs antigos'),
 ('database_version', '1.0', 'Versão do schema do banco de dados');
 
@@ -6,10 +6,125 @@ Responsável por todas as operações com o banco de dados
 import sqlite3
 import os
 import json
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+import atexit
+import functools
+import weakref
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from contextlib import contextmanager
 
+# Versão do schema gravada em PRAGMA user_version; incrementar ao alterar config/database.sql
+SCHEMA_VERSION = 2
+
+# PRAGMAs aplicados em cada nova conexão (journal_mode=WAL é persistente no arquivo)
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-131072",
+    "PRAGMA mmap_size=536870912",
+    "PRAGMA wal_autocheckpoint=1000",
+)
+
+# Máximo de facebook_ids conhecidos mantidos em memória (LRU)
+_SEEN_IDS_MAX = 100_000
+
+# Logs ficam em memória e são gravados em lote ao atingir este total ou a cada intervalo
+_LOG_FLUSH_ROWS = 500
+_LOG_FLUSH_INTERVAL = 1.0
+# Limite do buffer quando os lotes voltam por falha do banco (os mais antigos são descartados)
+_LOG_BUFFER_MAX = 10_000
+
+# Parâmetros por consulta IN (...), abaixo do limite de variáveis do SQLite
+_IN_CHUNK = 500
+
+# Linhas buscadas por vez nos métodos iter_* que fazem streaming
+_FETCH_ARRAYSIZE = 200
+
+# Tamanho do cache de statements compilados de cada conexão (padrão do sqlite3: 128)
+_CACHED_STATEMENTS = 256
+
+# SQL dos caminhos quentes, compartilhado para reaproveitar o statement compilado
+# Upsert real (sem DELETE + INSERT), preservando a descrição quando não informada
+_SQL_UPSERT_CONFIG = """
+    INSERT INTO config (key, value, description) 
+    VALUES (?, ?, ?)
+    ON CONFLICT(key) DO UPDATE SET 
+        value = excluded.value,
+        description = COALESCE(excluded.description, description)
+"""
+_SQL_INSERT_LISTING = """
+    INSERT INTO listings 
+    (facebook_id, title, price, url, description, location, image_url, city_id, keyword_id) 
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_INSERT_LISTING_IGNORE = _SQL_INSERT_LISTING.replace("INSERT INTO", "INSERT OR IGNORE INTO")
+_SQL_INCREMENT_FOUND = "UPDATE keywords SET total_found = total_found + ? WHERE id = ?"
+_SQL_LISTING_EXISTS = "SELECT 1 FROM listings WHERE facebook_id = ?"
+_SQL_UPDATE_KEYWORD_CHECK = """
+    UPDATE keywords 
+    SET last_check = CURRENT_TIMESTAMP,
+        next_check_at = datetime('now', '+' || check_interval || ' seconds'),
+        total_checks = total_checks + 1
+    WHERE id = ?
+"""
+_SQL_UPDATE_KEYWORD_INTERVAL = """
+    UPDATE keywords 
+    SET check_interval = ?1,
+        next_check_at = datetime(last_check, '+' || ?1 || ' seconds')
+    WHERE id = ?2
+"""
+_SQL_INSERT_LOG = """
+    INSERT INTO system_logs (level, message, module, function, details, created_at) 
+    VALUES (?, ?, ?, ?, json(?), ?)
+"""
+_SQL_INSERT_EXECUTION_STAT = """
+    INSERT INTO execution_stats 
+    (keyword_id, city_id, execution_time_ms, listings_found, new_listings, errors) 
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+# Notificação já com o status final do envio (sem INSERT pending + UPDATE)
+_SQL_INSERT_NOTIFICATION_RESULT = """
+    INSERT INTO notifications (listing_id, type, message, status, error_message, sent_at) 
+    VALUES (?1, ?2, ?3, ?4, ?5, CASE WHEN ?4 = 'sent' THEN CURRENT_TIMESTAMP END)
+"""
+
+def _coerce(value: str) -> Any:
+    """Converter valor de configuração (texto) para o tipo apropriado"""
+    if value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+@functools.lru_cache(maxsize=None)
+def _read_schema(schema_path: str) -> str:
+    """Ler o arquivo de schema (uma vez por processo)"""
+    with open(schema_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def _flush_logs_at_exit(ref: 'weakref.ReferenceType'):
+    """Gravar os logs pendentes no encerramento, se o gerenciador ainda existir"""
+    db = ref()
+    if db is not None:
+        db.flush_logs()
+
+def _utc_cutoff(hours: float = 0, days: float = 0) -> str:
+    """Limite de tempo em UTC no formato do CURRENT_TIMESTAMP, para comparar com índices"""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=hours, days=days)
+    return cutoff.strftime('%Y-%m-%d %H:%M:%S')
+
+# Tabelas contadas em get_database_info
+_COUNTED_TABLES = ('cities', 'keywords', 'listings', 'system_logs', 'notifications', 'execution_stats')
+_SQL_TABLE_COUNTS = "\nUNION ALL ".join(
+    f"SELECT '{table}', COUNT(*) FROM {table}" for table in _COUNTED_TABLES
+)
+
 class DatabaseManager:
     def __init__(self, db_path: str = None):
         if db_path is None:
@@ -18,92 +133,262 @@ class DatabaseManager:
         self.db_path = db_path
         self.schema_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'database.sql')
         
+        # Cache das configurações (chave -> valor já convertido), carregado sob demanda
+        self._config_cache: Optional[Dict[str, Any]] = None
+        self._config_lock = threading.RLock()
+        
+        # facebook_ids já gravados (LRU), pré-carregado no primeiro listing_exists.
+        # Os dois caches são compartilhados pelas threads do pool de navegadores
+        self._seen_ids: Optional[OrderedDict] = None
+        self._seen_lock = threading.Lock()
+        
+        # Buffer de logs pendentes, gravado por uma thread em segundo plano
+        self._log_buffer: List[Tuple] = []
+        self._log_lock = threading.Lock()
+        self._log_wake = threading.Event()
+        self._log_stop = threading.Event()
+        self._log_flusher: Optional[threading.Thread] = None
+        # Referência fraca: o atexit não mantém o gerenciador vivo
+        atexit.register(_flush_logs_at_exit, weakref.ref(self))
+        
+        # Uma conexão persistente por thread, reaproveitada durante a vida do gerenciador
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        
         # Criar diretório se não existir
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
+        # Modo WAL: leitores não bloqueiam o escritor e cada commit faz um único fsync
+        self._enable_wal()
+        
         # Inicializar banco se necessário
         self._initialize_database()
     
+    def _enable_wal(self):
+        """Ativar journal_mode=WAL (persistente no arquivo do banco)"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+    
     def _initialize_database(self):
-        """Inicializar banco de dados com schema"""
+        """Inicializar banco de dados com schema (apenas se a versão mudou)"""
         try:
-            with open(self.schema_path, 'r', encoding='utf-8') as f:
-                schema_sql = f.read()
-            
             with self.get_connection() as conn:
-                conn.executescript(schema_sql)
+                if conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+                    return
+                
+                conn.executescript(_read_schema(self.schema_path))
+                self._migrate_schema(conn)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
                 conn.commit()
+                # Atualizar estatísticas do planejador apenas onde necessário
+                conn.execute("PRAGMA optimize")
                 
             print(f"✅ Banco de dados inicializado: {self.db_path}")
         except Exception as e:
             print(f"❌ Erro ao inicializar banco: {e}")
             raise
     
+    def _migrate_schema(self, conn: sqlite3.Connection):
+        """Aplicar alterações de schema em bancos criados por versões anteriores"""
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(keywords)")}
+        if 'next_check_at' not in columns:
+            conn.execute("ALTER TABLE keywords ADD COLUMN next_check_at DATETIME")
+            conn.execute("""
+                UPDATE keywords 
+                SET next_check_at = datetime(last_check, '+' || check_interval || ' seconds')
+                WHERE last_check IS NOT NULL
+            """)
+        
+        # Criado aqui (e não no database.sql) porque depende da coluna migrada
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_keywords_next_check 
+            ON keywords(next_check_at) WHERE active = 1
+        """)
+    
+    def _thread_connection(self) -> sqlite3.Connection:
+        """Obter (ou criar) a conexão persistente da thread atual"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # check_same_thread=False apenas para permitir que close() feche todas
+            conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                   cached_statements=_CACHED_STATEMENTS)
+            conn.row_factory = sqlite3.Row  # Permite acesso por nome da coluna
+            for pragma in _CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
     @contextmanager
     def get_connection(self):
-        """Context manager para conexões com o banco"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Permite acesso por nome da coluna
+        """Context manager para a conexão (persistente) da thread atual"""
+        conn = self._thread_connection()
+        self._local.depth += 1
         try:
             yield conn
         finally:
+            self._local.depth -= 1
+            # No bloco mais externo, descartar escritas não confirmadas
+            # (mesmo efeito que o fechamento da conexão tinha antes)
+            if self._local.depth == 0 and conn.in_transaction:
+                conn.rollback()
+    
+    @contextmanager
+    def _write_connection(self, conn: sqlite3.Connection = None):
+        """Conexão para escrita: a do chamador (sem commit) ou a da thread, com commit ao final"""
+        if conn is not None:
+            in_transaction = conn.in_transaction
+            yield conn
+            # Contrato de conn=: a transação do chamador nunca é encerrada aqui dentro
+            if in_transaction and not conn.in_transaction:
+                raise RuntimeError("Transação do chamador encerrada por um método com conn=")
+            return
+        
+        with self.get_connection() as own:
+            try:
+                yield own
+            except BaseException:
+                own.rollback()
+                raise
+            own.commit()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Agrupar várias escritas numa única transação (BEGIN IMMEDIATE ... COMMIT)
+        
+        Uso:
+            with db.transaction() as conn:
+                db.add_listing(..., conn=conn)
+                db.add_log(..., conn=conn)
+        
+        Métodos de escrita que recebem conn não fazem commit próprio.
+        """
+        with self.get_connection() as conn:
+            if conn.in_transaction:
+                # Já dentro de uma transação: quem a abriu faz o commit
+                yield conn
+                return
+            
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                # Caches podem ter registrado escritas que foram desfeitas
+                self.invalidate_config_cache()
+                with self._seen_lock:
+                    self._seen_ids = None
+                raise
+            conn.commit()
+    
+    def close(self):
+        """Parar a thread de flush e fechar todas as conexões abertas por este gerenciador"""
+        with self._log_lock:
+            flusher, self._log_flusher = self._log_flusher, None
+        if flusher is not None:
+            self._log_stop.set()
+            self._log_wake.set()
+            if flusher is not threading.current_thread():
+                flusher.join()
+        
+        self.flush_logs()
+        
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        
+        for conn in connections:
             conn.close()
+        
+        # Conexões fechadas não podem ser reutilizadas por nenhuma thread
+        self._local = threading.local()
     
     # =================================================================
     # CONFIGURAÇÕES
     # =================================================================
     
+    def _load_config_cache(self) -> Dict[str, Any]:
+        """Carregar todas as configurações em memória com uma única consulta"""
+        with self._config_lock:
+            if self._config_cache is None:
+                with self.get_connection() as conn:
+                    cursor = conn.execute("SELECT key, value FROM config")
+                    # Conversão de tipo feita uma única vez, na carga
+                    self._config_cache = {
+                        row['key']: None if row['value'] is None else _coerce(row['value'])
+                        for row in cursor.fetchall()
+                    }
+            return self._config_cache
+    
+    def invalidate_config_cache(self):
+        """Descartar o cache (ex.: após alterações feitas por outro processo)"""
+        with self._config_lock:
+            self._config_cache = None
+    
+    def _cache_configs(self, items: List[Tuple[str, Any]]):
+        """Registrar no cache valores já gravados (se o cache estiver carregado)"""
+        with self._config_lock:
+            if self._config_cache is not None:
+                self._config_cache.update(items)
+    
     def get_config(self, key: str, default: Any = None) -> Any:
         """Obter valor de configuração"""
-        with self.get_connection() as conn:
-            cursor = conn.execute("SELECT value FROM config WHERE key = ?", (key,))
-            row = cursor.fetchone()
-            
-            if row:
-                value = row['value']
-                # Tentar converter para tipos apropriados
-                if value.lower() in ('true', 'false'):
-                    return value.lower() == 'true'
-                try:
-                    return int(value)
-                except ValueError:
-                    try:
-                        return float(value)
-                    except ValueError:
-                        return value
-            
-            return default
+        value = self._load_config_cache().get(key)
+        return default if value is None else value
     
-    def set_config(self, key: str, value: Any, description: str = None):
-        """Definir valor de configuração"""
-        with self.get_connection() as conn:
-            conn.execute("""
-                INSERT OR REPLACE INTO config (key, value, description) 
-                VALUES (?, ?, ?)
-            """, (key, str(value), description))
-            conn.commit()
+    def set_config(self, key: str, value: Any, description: str = None,
+                   conn: sqlite3.Connection = None):
+        """Definir valor de configuração (sem escrita se o valor não mudou)"""
+        cache = self._load_config_cache()
+        new_value = _coerce(str(value))
+        if description is None and key in cache and cache[key] == new_value:
+            return
+        
+        with self._write_connection(conn) as conn:
+            conn.execute(_SQL_UPSERT_CONFIG, (key, str(value), description))
+        
+        self._cache_configs([(key, new_value)])
+    
+    def set_configs(self, mapping: Dict[str, Any], conn: sqlite3.Connection = None):
+        """Definir várias configurações numa única transação (apenas as alteradas)"""
+        with self._config_lock:
+            cache = self._load_config_cache()
+            rows = [
+                (key, str(value), None) for key, value in mapping.items()
+                if key not in cache or cache[key] != _coerce(str(value))
+            ]
+        if not rows:
+            return
+        
+        with self._write_connection(conn) as conn:
+            conn.executemany(_SQL_UPSERT_CONFIG, rows)
+        
+        self._cache_configs([(key, _coerce(value)) for key, value, _ in rows])
     
     def get_all_config(self) -> Dict[str, Any]:
         """Obter todas as configurações"""
-        configs = {}
-        with self.get_connection() as conn:
-            cursor = conn.execute("SELECT key, value FROM config")
-            for row in cursor.fetchall():
-                configs[row['key']] = self.get_config(row['key'])
-        return configs
+        with self._config_lock:
+            return dict(self._load_config_cache())
     
     # =================================================================
     # CIDADES
     # =================================================================
     
-    def add_city(self, name: str, facebook_slug: str, active: bool = True) -> int:
+    def add_city(self, name: str, facebook_slug: str, active: bool = True,
+                 conn: sqlite3.Connection = None) -> int:
         """Adicionar nova cidade"""
-        with self.get_connection() as conn:
+        with self._write_connection(conn) as conn:
             cursor = conn.execute("""
                 INSERT INTO cities (name, facebook_slug, active) 
                 VALUES (?, ?, ?)
             """, (name, facebook_slug, active))
-            conn.commit()
             return cursor.lastrowid
     
     def get_cities(self, active_only: bool = True) -> List[Dict[str, Any]]:
@@ -120,6 +405,27 @@ class DatabaseManager:
             cursor = conn.execute(query, params)
             return [dict(row) for row in cursor.fetchall()]
     
+    def iter_cities(self, active_only: bool = True) -> Iterator[Tuple]:
+        """Iterar cidades como tuplas (id, name, facebook_slug, active)"""
+        query = "SELECT id, name, facebook_slug, active FROM cities"
+        if active_only:
+            query += " WHERE active = 1"
+        query += " ORDER BY name"
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            yield from cursor.execute(query)
+    
+    def count_cities(self, active_only: bool = True) -> int:
+        """Contar cidades"""
+        query = "SELECT COUNT(*) FROM cities"
+        if active_only:
+            query += " WHERE active = 1"
+        
+        with self.get_connection() as conn:
+            return conn.execute(query).fetchone()[0]
+    
     def get_city_by_slug(self, facebook_slug: str) -> Optional[Dict[str, Any]]:
         """Obter cidade por slug do Facebook"""
         with self.get_connection() as conn:
@@ -129,26 +435,25 @@ class DatabaseManager:
             row = cursor.fetchone()
             return dict(row) if row else None
     
-    def update_city_status(self, city_id: int, active: bool):
+    def update_city_status(self, city_id: int, active: bool, conn: sqlite3.Connection = None):
         """Atualizar status de uma cidade"""
-        with self.get_connection() as conn:
+        with self._write_connection(conn) as conn:
             conn.execute("""
                 UPDATE cities SET active = ? WHERE id = ?
             """, (active, city_id))
-            conn.commit()
     
     # =================================================================
     # PALAVRAS-CHAVE
     # =================================================================
     
-    def add_keyword(self, term: str, check_interval: int = 120, active: bool = True) -> int:
+    def add_keyword(self, term: str, check_interval: int = 120, active: bool = True,
+                    conn: sqlite3.Connection = None) -> int:
         """Adicionar nova palavra-chave"""
-        with self.get_connection() as conn:
+        with self._write_connection(conn) as conn:
             cursor = conn.execute("""
                 INSERT INTO keywords (term, check_interval, active) 
                 VALUES (?, ?, ?)
             """, (term, check_interval, active))
-            conn.commit()
             return cursor.lastrowid
     
     def get_keywords(self, active_only: bool = True) -> List[Dict[str, Any]]:
@@ -165,38 +470,61 @@ class DatabaseManager:
             cursor = conn.execute(query, params)
             return [dict(row) for row in cursor.fetchall()]
     
+    def iter_keywords(self, active_only: bool = True) -> Iterator[Tuple]:
+        """Iterar palavras-chave como tuplas
+        (id, term, check_interval, total_checks, total_found, active)"""
+        query = """
+            SELECT id, term, check_interval, total_checks, total_found, active
+            FROM keywords
+        """
+        if active_only:
+            query += " WHERE active = 1"
+        query += " ORDER BY term"
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            yield from cursor.execute(query)
+    
+    def count_keywords(self, active_only: bool = True) -> int:
+        """Contar palavras-chave"""
+        query = "SELECT COUNT(*) FROM keywords"
+        if active_only:
+            query += " WHERE active = 1"
+        
+        with self.get_connection() as conn:
+            return conn.execute(query).fetchone()[0]
+    
+    def get_keyword_by_term(self, term: str) -> Optional[Dict[str, Any]]:
+        """Obter palavra-chave pelo termo"""
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT * FROM keywords WHERE term = ? LIMIT 1
+            """, (term,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
     def get_keywords_to_check(self) -> List[Dict[str, Any]]:
         """Obter palavras-chave que precisam ser verificadas"""
         with self.get_connection() as conn:
             cursor = conn.execute("""
                 SELECT * FROM keywords 
                 WHERE active = 1 
-                AND (
-                    last_check IS NULL 
-                    OR datetime(last_check, '+' || check_interval || ' seconds') <= datetime('now')
-                )
-                ORDER BY last_check ASC
+                AND (next_check_at IS NULL OR next_check_at <= datetime('now'))
+                ORDER BY next_check_at ASC
             """)
             return [dict(row) for row in cursor.fetchall()]
     
-    def update_keyword_check(self, keyword_id: int):
+    def update_keyword_check(self, keyword_id: int, conn: sqlite3.Connection = None):
         """Atualizar timestamp da última verificação"""
-        with self.get_connection() as conn:
-            conn.execute("""
-                UPDATE keywords 
-                SET last_check = CURRENT_TIMESTAMP,
-                    total_checks = total_checks + 1
-                WHERE id = ?
-            """, (keyword_id,))
-            conn.commit()
+        with self._write_connection(conn) as conn:
+            conn.execute(_SQL_UPDATE_KEYWORD_CHECK, (keyword_id,))
     
-    def update_keyword_interval(self, keyword_id: int, check_interval: int):
+    def update_keyword_interval(self, keyword_id: int, check_interval: int,
+                                conn: sqlite3.Connection = None):
         """Atualizar intervalo de verificação"""
-        with self.get_connection() as conn:
-            conn.execute("""
-                UPDATE keywords SET check_interval = ? WHERE id = ?
-            """, (check_interval, keyword_id))
-            conn.commit()
+        with self._write_connection(conn) as conn:
+            conn.execute(_SQL_UPDATE_KEYWORD_INTERVAL, (check_interval, keyword_id))
     
     # =================================================================
     # ANÚNCIOS
@@ -204,60 +532,189 @@ class DatabaseManager:
     
     def add_listing(self, facebook_id: str, title: str, price: str, url: str, 
                    city_id: int, keyword_id: int, description: str = None, 
-                   location: str = None, image_url: str = None) -> int:
+                   location: str = None, image_url: str = None,
+                   conn: sqlite3.Connection = None) -> int:
         """Adicionar novo anúncio"""
-        with self.get_connection() as conn:
-            cursor = conn.execute("""
-                INSERT INTO listings 
-                (facebook_id, title, price, url, description, location, image_url, city_id, keyword_id) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (facebook_id, title, price, url, description, location, image_url, city_id, keyword_id))
-            conn.commit()
+        return self.add_listings_bulk([
+            (facebook_id, title, price, url, description, location, image_url, city_id, keyword_id)
+        ], conn=conn)[0]
+    
+    def add_listings_bulk(self, listings: List[Tuple], conn: sqlite3.Connection = None) -> List[int]:
+        """
+        Adicionar vários anúncios numa única transação
+        
+        Cada tupla segue a ordem das colunas: (facebook_id, title, price, url,
+        description, location, image_url, city_id, keyword_id).
+        Retorna os IDs inseridos, na mesma ordem.
+        """
+        if not listings:
+            return []
+        
+        found_per_keyword = Counter(row[8] for row in listings)
+        
+        with self._write_connection(conn) as conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(_SQL_INSERT_LISTING, listings)
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
             
-            # Atualizar contador de encontrados
-            conn.execute("""
-                UPDATE keywords SET total_found = total_found + 1 WHERE id = ?
-            """, (keyword_id,))
-            conn.commit()
+            # Atualizar contadores de encontrados (um UPDATE por palavra-chave)
+            conn.executemany(_SQL_INCREMENT_FOUND, [
+                (count, keyword_id) for keyword_id, count in found_per_keyword.items()
+            ])
+        
+        self._remember_ids(row[0] for row in listings)
+        
+        # Com o lock de escrita mantido, os IDs gerados são consecutivos
+        return list(range(last_id - len(listings) + 1, last_id + 1))
+    
+    def try_add_listing(self, facebook_id: str, title: str, price: str, url: str, 
+                        city_id: int, keyword_id: int, description: str = None, 
+                        location: str = None, image_url: str = None,
+                        conn: sqlite3.Connection = None) -> Optional[int]:
+        """
+        Adicionar anúncio se ainda não existir (INSERT OR IGNORE)
+        
+        Retorna o ID do novo anúncio, ou None se o facebook_id já estava gravado.
+        """
+        with self._write_connection(conn) as conn:
+            cursor = conn.execute(_SQL_INSERT_LISTING_IGNORE, (
+                facebook_id, title, price, url, description, location, image_url, city_id, keyword_id
+            ))
+            if not cursor.rowcount:
+                return None
             
-            return cursor.lastrowid
+            conn.execute(_SQL_INCREMENT_FOUND, (1, keyword_id))
+        
+        self._remember_ids((facebook_id,))
+        return cursor.lastrowid
+    
+    def _load_seen_ids(self) -> OrderedDict:
+        """Pré-carregar os facebook_ids mais recentes no cache LRU (chamar com _seen_lock)"""
+        if self._seen_ids is None:
+            with self.get_connection() as conn:
+                cursor = conn.execute("""
+                    SELECT facebook_id FROM listings ORDER BY found_at DESC LIMIT ?
+                """, (_SEEN_IDS_MAX,))
+                cursor.row_factory = None
+                # Mais antigos primeiro, para serem os primeiros descartados
+                ids = [row[0] for row in cursor.fetchall()]
+            self._seen_ids = OrderedDict.fromkeys(reversed(ids))
+        return self._seen_ids
+    
+    def _remember_ids(self, facebook_ids):
+        """Registrar facebook_ids no cache LRU (se carregado), descartando os mais antigos"""
+        with self._seen_lock:
+            seen = self._seen_ids
+            if seen is None:
+                return
+            for facebook_id in facebook_ids:
+                seen[facebook_id] = None
+                seen.move_to_end(facebook_id)
+            while len(seen) > _SEEN_IDS_MAX:
+                seen.popitem(last=False)
+    
+    def existing_ids(self, facebook_ids: List[str]) -> set:
+        """Retornar quais dos facebook_ids já estão gravados (consultas IN em lotes)"""
+        with self._seen_lock:
+            seen = self._load_seen_ids()
+            found = {fid for fid in facebook_ids if fid in seen}
+        pending = [fid for fid in set(facebook_ids) if fid not in found]
+        
+        with self.get_connection() as conn:
+            for start in range(0, len(pending), _IN_CHUNK):
+                chunk = pending[start:start + _IN_CHUNK]
+                cursor = conn.execute(
+                    "SELECT facebook_id FROM listings WHERE facebook_id IN ({})".format(
+                        ','.join('?' * len(chunk))), chunk)
+                found.update(row[0] for row in cursor.fetchall())
+        
+        self._remember_ids(found)
+        return found
     
     def listing_exists(self, facebook_id: str) -> bool:
-        """Verificar se anúncio já existe"""
+        """
+        Verificar se anúncio já existe
+        
+        Obsoleto para o fluxo de gravação: prefira try_add_listing, que
+        verifica e insere numa única operação.
+        """
+        with self._seen_lock:
+            seen = self._load_seen_ids()
+            if facebook_id in seen:
+                seen.move_to_end(facebook_id)
+                return True
+        
+        # Só resultados positivos são guardados: o anúncio pode surgir depois
         with self.get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT 1 FROM listings WHERE facebook_id = ?
-            """, (facebook_id,))
-            return cursor.fetchone() is not None
+            cursor = conn.execute(_SQL_LISTING_EXISTS, (facebook_id,))
+            exists = cursor.fetchone() is not None
+        
+        if exists:
+            self._remember_ids((facebook_id,))
+        return exists
     
-    def get_recent_listings(self, hours: int = 24, limit: int = 100) -> List[Dict[str, Any]]:
-        """Obter anúncios recentes"""
+    def get_recent_listings(self, hours: int = 24, limit: int = 100) -> List[sqlite3.Row]:
+        """Obter anúncios recentes (linhas sqlite3.Row, acessíveis por nome da coluna)"""
         with self.get_connection() as conn:
             cursor = conn.execute("""
                 SELECT l.*, c.name as city_name, k.term as keyword_term
                 FROM listings l
                 LEFT JOIN cities c ON l.city_id = c.id
                 LEFT JOIN keywords k ON l.keyword_id = k.id
-                WHERE l.found_at >= datetime('now', '-' || ? || ' hours')
+                WHERE l.found_at >= ?
                 ORDER BY l.found_at DESC
                 LIMIT ?
-            """, (hours, limit))
-            return [dict(row) for row in cursor.fetchall()]
+            """, (_utc_cutoff(hours=hours), limit))
+            return cursor.fetchall()
     
-    def mark_listing_notified(self, listing_id: int):
-        """Marcar anúncio como notificado"""
+    def count_recent_listings(self, hours: int = 24) -> int:
+        """Contar anúncios encontrados nas últimas horas"""
         with self.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT COUNT(*) FROM listings
+                WHERE found_at >= ?
+            """, (_utc_cutoff(hours=hours),))
+            return cursor.fetchone()[0]
+    
+    def mark_listing_notified(self, listing_id: int, conn: sqlite3.Connection = None):
+        """Marcar anúncio como notificado"""
+        with self._write_connection(conn) as conn:
             conn.execute("""
                 UPDATE listings 
                 SET notified = 1, notified_at = CURRENT_TIMESTAMP 
                 WHERE id = ?
             """, (listing_id,))
-            conn.commit()
+    
+    def mark_listings_notified_bulk(self, listing_ids: List[int],
+                                    conn: sqlite3.Connection = None) -> int:
+        """Marcar vários anúncios como notificados numa única transação"""
+        listing_ids = list(listing_ids)
+        if not listing_ids:
+            return 0
+        
+        updated = 0
+        with self._write_connection(conn) as conn:
+            for start in range(0, len(listing_ids), _IN_CHUNK):
+                chunk = listing_ids[start:start + _IN_CHUNK]
+                cursor = conn.execute("""
+                    UPDATE listings 
+                    SET notified = 1, notified_at = CURRENT_TIMESTAMP 
+                    WHERE id IN ({})
+                """.format(','.join('?' * len(chunk))), chunk)
+                updated += cursor.rowcount
+        return updated
     
     def get_unnotified_listings(self) -> List[Dict[str, Any]]:
         """Obter anúncios não notificados"""
+        return list(self.iter_unnotified_listings())
+    
+    def iter_unnotified_listings(self) -> Iterator[Dict[str, Any]]:
+        """Iterar anúncios não notificados sem materializar o resultado inteiro"""
         with self.get_connection() as conn:
-            cursor = conn.execute("""
+            cursor = conn.cursor()
+            cursor.arraysize = _FETCH_ARRAYSIZE
+            cursor.execute("""
                 SELECT l.*, c.name as city_name, k.term as keyword_term
                 FROM listings l
                 LEFT JOIN cities c ON l.city_id = c.id
@@ -265,31 +722,116 @@ class DatabaseManager:
                 WHERE l.notified = 0
                 ORDER BY l.found_at ASC
             """)
-            return [dict(row) for row in cursor.fetchall()]
+            for rows in iter(cursor.fetchmany, []):
+                for row in rows:
+                    yield dict(row)
     
     # =================================================================
     # LOGS
     # =================================================================
     
     def add_log(self, level: str, message: str, module: str = None, 
-                function: str = None, details: Dict = None):
-        """Adicionar entrada de log"""
+                function: str = None, details: Dict = None,
+                conn: sqlite3.Connection = None):
+        """
+        Adicionar entrada de log (gravada em lote pela thread de flush)
+        
+        Com conn (ver transaction()), a linha é gravada direto na transação do chamador.
+        """
         details_json = json.dumps(details) if details else None
+        # Horário registrado agora, para não ser distorcido pelo lote
+        created_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        row = (level, message, module, function, details_json, created_at)
+        
+        if conn is not None:
+            conn.execute(_SQL_INSERT_LOG, row)
+            return
+        
+        with self._log_lock:
+            self._log_buffer.append(row)
+            full = len(self._log_buffer) >= _LOG_FLUSH_ROWS
+            
+            if self._log_flusher is None:
+                self._log_stop.clear()
+                self._log_flusher = threading.Thread(
+                    target=self._log_flush_loop, name="DatabaseLogFlusher", daemon=True
+                )
+                self._log_flusher.start()
+        
+        if full:
+            self._log_wake.set()
+    
+    def flush_logs(self):
+        """
+        Gravar os logs pendentes numa única transação
+        
+        Se o lote falhar, as linhas são regravadas uma a uma e só as que
+        falharem sozinhas são descartadas; se nenhuma entrar (banco
+        indisponível), o lote volta para o buffer.
         
+        Se a conexão desta thread está numa transação aberta pelo chamador
+        (transaction()), não faz nada: o commit/rollback dela não é daqui, e
+        a thread de flush grava o buffer depois.
+        """
         with self.get_connection() as conn:
-            conn.execute("""
-                INSERT INTO system_logs (level, message, module, function, details) 
-                VALUES (?, ?, ?, ?, ?)
-            """, (level, message, module, function, details_json))
+            if conn.in_transaction:
+                return
+            
+            with self._log_lock:
+                rows, self._log_buffer = self._log_buffer, []
+            
+            if not rows:
+                return
+            
+            try:
+                conn.executemany(_SQL_INSERT_LOG, rows)
+                conn.commit()
+                return
+            except sqlite3.Error:
+                conn.rollback()
+            
+            failed = []
+            for row in rows:
+                try:
+                    conn.execute(_SQL_INSERT_LOG, row)
+                except sqlite3.Error:
+                    failed.append(row)
+            
+            if len(failed) == len(rows):
+                conn.rollback()
+                with self._log_lock:
+                    self._log_buffer[:0] = rows
+                    del self._log_buffer[:-_LOG_BUFFER_MAX]
+                raise sqlite3.OperationalError(f"{len(rows)} logs não gravados; mantidos no buffer")
+            
             conn.commit()
+        
+        if failed:
+            print(f"❌ {len(failed)} logs inválidos descartados")
+    
+    def _log_flush_loop(self):
+        """Loop da thread de flush: grava a cada intervalo ou quando o buffer enche, até close()"""
+        while not self._log_stop.is_set():
+            self._log_wake.wait(_LOG_FLUSH_INTERVAL)
+            self._log_wake.clear()
+            if self._log_stop.is_set():
+                break
+            try:
+                self.flush_logs()
+            except Exception as e:
+                print(f"❌ Erro ao gravar logs: {e}")
+    
+    def get_logs(self, level: str = None, hours: int = 24, limit: int = 1000) -> List[sqlite3.Row]:
+        """Obter logs do sistema (linhas sqlite3.Row, acessíveis por nome da coluna)"""
+        return list(self.iter_logs(level, hours, limit))
     
-    def get_logs(self, level: str = None, hours: int = 24, limit: int = 1000) -> List[Dict[str, Any]]:
-        """Obter logs do sistema"""
+    def iter_logs(self, level: str = None, hours: int = 24, limit: int = 1000) -> Iterator[sqlite3.Row]:
+        """Iterar logs do sistema sem materializar o resultado inteiro"""
         query = """
             SELECT * FROM system_logs 
-            WHERE created_at >= datetime('now', '-' || ? || ' hours')
+            WHERE created_at >= ?
         """
-        params = [hours]
+        params = [_utc_cutoff(hours=hours)]
         
         if level:
             query += " AND level = ?"
@@ -298,18 +840,37 @@ class DatabaseManager:
         query += " ORDER BY created_at DESC LIMIT ?"
         params.append(limit)
         
+        self.flush_logs()
         with self.get_connection() as conn:
-            cursor = conn.execute(query, params)
-            return [dict(row) for row in cursor.fetchall()]
+            cursor = conn.cursor()
+            cursor.arraysize = _FETCH_ARRAYSIZE
+            cursor.execute(query, params)
+            for rows in iter(cursor.fetchmany, []):
+                yield from rows
     
-    def cleanup_old_logs(self, days: int = 30):
-        """Limpar logs antigos"""
+    def get_logs_with_filter(self, key: str, value: Any, hours: int = 24, 
+                             limit: int = 1000) -> List[sqlite3.Row]:
+        """Obter logs cujo campo details.<key> seja igual a value (filtrado no SQLite)"""
+        self.flush_logs()
         with self.get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT * FROM system_logs 
+                WHERE created_at >= ?
+                AND json_extract(details, '$.' || ?) = ?
+                ORDER BY created_at DESC LIMIT ?
+            """, (_utc_cutoff(hours=hours), key, value, limit))
+            return cursor.fetchall()
+    
+    def cleanup_old_logs(self, days: int = 30, conn: sqlite3.Connection = None):
+        """Limpar logs antigos"""
+        # Com conn, o buffer fica para a thread de flush (não gravar na transação do chamador)
+        if conn is None:
+            self.flush_logs()
+        with self._write_connection(conn) as conn:
             cursor = conn.execute("""
                 DELETE FROM system_logs 
-                WHERE created_at < datetime('now', '-' || ? || ' days')
-            """, (days,))
-            conn.commit()
+                WHERE created_at < ?
+            """, (_utc_cutoff(days=days),))
             return cursor.rowcount
     
     # =================================================================
@@ -317,45 +878,43 @@ class DatabaseManager:
     # =================================================================
     
     def add_execution_stat(self, keyword_id: int, city_id: int, execution_time_ms: int, 
-                          listings_found: int, new_listings: int, errors: int = 0):
+                          listings_found: int, new_listings: int, errors: int = 0,
+                          conn: sqlite3.Connection = None):
         """Adicionar estatística de execução"""
-        with self.get_connection() as conn:
-            conn.execute("""
-                INSERT INTO execution_stats 
-                (keyword_id, city_id, execution_time_ms, listings_found, new_listings, errors) 
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (keyword_id, city_id, execution_time_ms, listings_found, new_listings, errors))
-            conn.commit()
+        with self._write_connection(conn) as conn:
+            conn.execute(_SQL_INSERT_EXECUTION_STAT, (
+                keyword_id, city_id, execution_time_ms, listings_found, new_listings, errors
+            ))
     
     def get_stats_summary(self, hours: int = 24) -> Dict[str, Any]:
-        """Obter resumo de estatísticas"""
+        """Obter resumo de estatísticas (totais e top 5 palavras-chave numa única consulta)"""
         with self.get_connection() as conn:
-            # Estatísticas gerais
             cursor = conn.execute("""
+                WITH win AS (
+                    SELECT * FROM execution_stats 
+                    WHERE executed_at >= ?
+                ),
+                top AS (
+                    SELECT k.term, SUM(win.new_listings) as new_listings
+                    FROM win
+                    JOIN keywords k ON win.keyword_id = k.id
+                    GROUP BY k.term
+                    ORDER BY new_listings DESC
+                    LIMIT 5
+                )
                 SELECT 
                     COUNT(*) as total_executions,
-                    AVG(execution_time_ms) as avg_execution_time,
-                    SUM(listings_found) as total_listings_found,
-                    SUM(new_listings) as total_new_listings,
-                    SUM(errors) as total_errors
-                FROM execution_stats 
-                WHERE executed_at >= datetime('now', '-' || ? || ' hours')
-            """, (hours,))
+                    COALESCE(AVG(execution_time_ms), 0) as avg_execution_time,
+                    COALESCE(SUM(listings_found), 0) as total_listings_found,
+                    COALESCE(SUM(new_listings), 0) as total_new_listings,
+                    COALESCE(SUM(errors), 0) as total_errors,
+                    (SELECT json_group_array(json_object('term', term, 'new_listings', new_listings))
+                     FROM top) as top_keywords
+                FROM win
+            """, (_utc_cutoff(hours=hours),))
             
             stats = dict(cursor.fetchone())
-            
-            # Top keywords
-            cursor = conn.execute("""
-                SELECT k.term, SUM(es.new_listings) as new_listings
-                FROM execution_stats es
-                JOIN keywords k ON es.keyword_id = k.id
-                WHERE es.executed_at >= datetime('now', '-' || ? || ' hours')
-                GROUP BY k.term
-                ORDER BY new_listings DESC
-                LIMIT 5
-            """, (hours,))
-            
-            stats['top_keywords'] = [dict(row) for row in cursor.fetchall()]
+            stats['top_keywords'] = json.loads(stats['top_keywords'])
             
             return stats
     
@@ -364,20 +923,36 @@ class DatabaseManager:
     # =================================================================
     
     def add_notification(self, listing_id: int, notification_type: str, 
-                        message: str, status: str = 'pending') -> int:
+                        message: str, status: str = 'pending',
+                        conn: sqlite3.Connection = None) -> int:
         """Adicionar notificação"""
-        with self.get_connection() as conn:
+        with self._write_connection(conn) as conn:
             cursor = conn.execute("""
                 INSERT INTO notifications (listing_id, type, message, status) 
                 VALUES (?, ?, ?, ?)
             """, (listing_id, notification_type, message, status))
-            conn.commit()
             return cursor.lastrowid
     
+    def add_notifications_bulk(self, notifications: List[Tuple],
+                               conn: sqlite3.Connection = None) -> int:
+        """
+        Registrar vários envios de notificação numa única transação
+        
+        Cada tupla: (listing_id, type, message, status, error_message), com o
+        status final ('sent' ou 'failed'); sent_at é preenchido para 'sent'.
+        Retorna quantas notificações foram gravadas.
+        """
+        if not notifications:
+            return 0
+        
+        with self._write_connection(conn) as conn:
+            conn.executemany(_SQL_INSERT_NOTIFICATION_RESULT, notifications)
+        return len(notifications)
+    
     def update_notification_status(self, notification_id: int, status: str, 
-                                  error_message: str = None):
+                                  error_message: str = None, conn: sqlite3.Connection = None):
         """Atualizar status de notificação"""
-        with self.get_connection() as conn:
+        with self._write_connection(conn) as conn:
             if status == 'sent':
                 conn.execute("""
                     UPDATE notifications 
@@ -390,7 +965,6 @@ class DatabaseManager:
                     SET status = ?, error_message = ?
                     WHERE id = ?
                 """, (status, error_message, notification_id))
-            conn.commit()
     
     # =================================================================
     # UTILITÁRIOS
@@ -404,63 +978,51 @@ class DatabaseManager:
             # Tamanho do arquivo
             info['file_size_mb'] = round(os.path.getsize(self.db_path) / (1024 * 1024), 2)
             
-            # Contadores de tabelas
-            tables = ['cities', 'keywords', 'listings', 'system_logs', 'notifications', 'execution_stats']
-            for table in tables:
-                cursor = conn.execute(f"SELECT COUNT(*) as count FROM {table}")
-                info[f'{table}_count'] = cursor.fetchone()['count']
+            # Contadores de tabelas (uma única consulta)
+            cursor = conn.execute(_SQL_TABLE_COUNTS)
+            for table, count in cursor.fetchall():
+                info[f'{table}_count'] = count
             
             # Versão do schema
             info['schema_version'] = self.get_config('database_version', '1.0')
             
             return info
     
-    def backup_database(self, backup_path: str):
-        """Fazer backup do banco de dados"""
-        import shutil
-        shutil.copy2(self.db_path, backup_path)
-        return backup_path
-    
-    def get_city_by_slug(self, slug: str) -> Dict[str, Any]:
-        """Buscar cidade por slug"""
+    def get_init_summary(self, preview: int = 5) -> Dict[str, Any]:
+        """Obter contadores e amostra de cidades/palavras-chave em uma conexão"""
         with self.get_connection() as conn:
+            counts = {}
+            for table in ('cities', 'keywords', 'listings'):
+                cursor = conn.execute(f"SELECT COUNT(*) FROM {table}")
+                counts[table] = cursor.fetchone()[0]
+            
             cursor = conn.execute("""
-                SELECT * FROM cities WHERE facebook_slug = ?
-            """, (slug,))
-            row = cursor.fetchone()
-            return dict(row) if row else None
-    
-    def update_city_status(self, city_id: int, active: bool):
-        """Atualizar status da cidade"""
-        with self.get_connection() as conn:
-            conn.execute("""
-                UPDATE cities SET active = ? WHERE id = ?
-            """, (active, city_id))
-            conn.commit()
-    
-    def update_keyword_interval(self, keyword_id: int, interval: int):
-        """Atualizar intervalo da palavra-chave"""
-        with self.get_connection() as conn:
-            conn.execute("""
-                UPDATE keywords SET check_interval = ? WHERE id = ?
-            """, (interval, keyword_id))
-            conn.commit()
-    
-    def get_recent_listings(self, hours: int, limit: int = 50) -> List[Dict[str, Any]]:
-        """Obter anúncios recentes"""
-        with self.get_connection() as conn:
+                SELECT id, name, facebook_slug, active FROM cities
+                ORDER BY name LIMIT ?
+            """, (preview,))
+            cities = [dict(row) for row in cursor.fetchall()]
+            
             cursor = conn.execute("""
-                SELECT l.*, k.term as keyword_term 
-                FROM listings l
-                LEFT JOIN keywords k ON l.keyword_id = k.id
-                WHERE l.found_at >= datetime('now', '-' || ? || ' hours')
-                ORDER BY l.found_at DESC
-                LIMIT ?
-            """, (hours, limit))
-            return [dict(row) for row in cursor.fetchall()]
+                SELECT id, term, check_interval, active FROM keywords
+                ORDER BY term LIMIT ?
+            """, (preview,))
+            keywords = [dict(row) for row in cursor.fetchall()]
+            
+            return {
+                'counts': counts,
+                'cities': cities,
+                'keywords': keywords
+            }
     
-    def get_all_config(self) -> Dict[str, Any]:
-        """Obter todas as configurações"""
-        with self.get_connection() as conn:
-            cursor = conn.execute("SELECT key, value FROM config")
-            return {row['key']: row['value'] for row in cursor.fetchall()}
+    def backup_database(self, backup_path: str):
+        """Fazer backup consistente do banco com a API de backup online do SQLite"""
+        self.flush_logs()
+        
+        dst = sqlite3.connect(backup_path)
+        try:
+            with self.get_connection() as src:
+                # Cópia em etapas, liberando o banco entre elas
+                src.backup(dst, pages=1000, sleep=0.001)
+        finally:
+            dst.close()
+        return backup_path
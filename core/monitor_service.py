@@ -6,9 +6,12 @@ Controla o loop de verificação e coordena todos os componentes
 import time
 import signal
 import sys
+import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
-from threading import Event
+from queue import Queue
+from typing import Dict, Any, List, Optional
+from threading import Event, Lock, Thread
 
 from .db_manager import DatabaseManager
 from .scraper_engine import ScraperEngine
@@ -17,6 +20,9 @@ from notifications.base import NotificationManager
 from notifications.console import ConsoleNotifier
 from notifications.file import FileNotifier
 
+# Máximo de anúncios enviados antes de gravar o lote como notificado
+_NOTIF_BATCH_SIZE = 32
+
 class MonitorService:
     """Serviço principal de monitoramento"""
     
@@ -26,6 +32,24 @@ class MonitorService:
         self.logger = get_logger("MonitorService", self.db)
         self.scraper = ScraperEngine(self.db, self.logger)
         
+        # Pool de navegadores: cada ScraperEngine tem seu próprio driver e
+        # é usado por uma cidade de cada vez
+        self.max_browsers = max(1, self.db.get_config('max_browser_instances', 3))
+        self.scrapers = [self.scraper] + [
+            ScraperEngine(self.db, self.logger) for _ in range(self.max_browsers - 1)
+        ]
+        self._scraper_pool: Queue = Queue()
+        for scraper in self.scrapers:
+            self._scraper_pool.put(scraper)
+        
+        # Pool de verificações e thread de notificações: criados em
+        # _start_workers (start() ou primeiro uso) e encerrados em _cleanup
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._notif_queue: Queue = Queue()
+        self._notif_pending = set()  # ids na fila ou em envio
+        self._notif_lock = Lock()
+        self._notif_thread: Optional[Thread] = None
+        
         # Estado do serviço
         self.running = False
         self.stop_event = Event()
@@ -39,6 +63,33 @@ class MonitorService:
         # Configurar handlers de sinais
         self._setup_signal_handlers()
     
+    def _start_workers(self):
+        """Criar o pool de verificações e a thread de notificações, se ainda não existem"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_browsers,
+                                                thread_name_prefix="Scraper")
+        
+        # Envio de notificações numa thread própria: o ciclo seguinte de
+        # scraping não espera os notificadores terminarem
+        if self._notif_thread is None:
+            self._notif_queue = Queue()
+            self._notif_thread = Thread(target=self._notif_worker, args=(self._notif_queue,),
+                                        name="Notifier", daemon=True)
+            self._notif_thread.start()
+    
+    def _stop_workers(self):
+        """Encerrar o pool de verificações e a thread de notificações (após esvaziar a fila)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        
+        if self._notif_thread is not None:
+            self._notif_queue.put(None)
+            self._notif_thread.join(timeout=30)
+            self._notif_thread = None
+            with self._notif_lock:
+                self._notif_pending.clear()
+    
     def _load_config(self):
         """Carregar configurações do banco"""
         self.config = {
@@ -73,9 +124,10 @@ class MonitorService:
             
             if 'file' in types_list:
                 file_config = {
-                    'file_path': self.db.get_config('file_notification_path', 'data/notifications.json'),
-                    'format': self.db.get_config('file_notification_format', 'json'),
-                    'append_mode': self.db.get_config('file_notification_append', True)
+                    'file_path': self.db.get_config('file_notification_path', 'data/notifications.jsonl'),
+                    'format': self.db.get_config('file_notification_format', 'jsonl'),
+                    'append_mode': self.db.get_config('file_notification_append', True),
+                    'fsync': self.db.get_config('file_notification_fsync', False)
                 }
                 self.notification_manager.add_notifier(FileNotifier(file_config))
         
@@ -132,12 +184,14 @@ class MonitorService:
             return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
         return "00:00:00"
     
-    def check_keyword_city_combination(self, keyword: Dict[str, Any], city: Dict[str, Any]) -> Dict[str, Any]:
+    def check_keyword_city_combination(self, keyword: Dict[str, Any], city: Dict[str, Any],
+                                       scraper: ScraperEngine = None) -> Dict[str, Any]:
         """Verificar uma combinação específica de palavra-chave e cidade"""
         self.logger.debug(f"Verificando '{keyword['term']}' em {city['name']}")
+        scraper = scraper or self.scraper
         
         try:
-            result = self.scraper.scrape_marketplace(
+            result = scraper.scrape_marketplace(
                 city_slug=city['facebook_slug'],
                 keyword=keyword['term'],
                 city_id=city['id'],
@@ -162,28 +216,44 @@ class MonitorService:
                 'execution_time_ms': 0
             }
     
-    def process_keyword(self, keyword: Dict[str, Any]) -> Dict[str, Any]:
-        """Processar uma palavra-chave em todas as cidades ativas"""
-        cities = self.db.get_cities(active_only=True)
+    def _check_city_pooled(self, keyword: Dict[str, Any], city: Dict[str, Any]) -> Dict[str, Any]:
+        """Verificar uma cidade usando um navegador livre do pool"""
+        if self.stop_event.is_set():
+            return {}
+        
+        scraper = self._scraper_pool.get()
+        try:
+            result = self.check_keyword_city_combination(keyword, city, scraper)
+            
+            # Delay (com variação) antes de liberar o navegador, para evitar sobrecarga;
+            # os delays de navegadores diferentes se sobrepõem
+            self.stop_event.wait(random.uniform(1, 3))
+            return result
+        finally:
+            self._scraper_pool.put(scraper)
+    
+    def process_keyword(self, keyword: Dict[str, Any],
+                        cities: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Processar uma palavra-chave em todas as cidades ativas (em paralelo)"""
+        if cities is None:
+            cities = self.db.get_cities(active_only=True)
         
         total_new = 0
         total_found = 0
         total_errors = 0
         execution_time = 0
         
-        self.logger.info(f"🔍 Processando '{keyword['term']}' em {len(cities)} cidades")
+        self.logger.info(f"🔍 Processando '{keyword['term']}' em {len(cities)} cidades "
+                         f"({min(self.max_browsers, len(cities))} navegadores)")
         
-        for city in cities:
-            result = self.check_keyword_city_combination(keyword, city)
-            
+        self._start_workers()
+        results = self._executor.map(lambda city: self._check_city_pooled(keyword, city), cities)
+        
+        for result in results:
             total_new += result.get('new_listings', 0)
             total_found += result.get('listings_found', 0)
             total_errors += result.get('errors', 0)
             execution_time += result.get('execution_time_ms', 0)
-            
-            # Delay entre cidades para evitar sobrecarga
-            if not self.stop_event.is_set():
-                time.sleep(2)
         
         # Atualizar timestamp da última verificação
         self.db.update_keyword_check(keyword['id'])
@@ -203,22 +273,65 @@ class MonitorService:
         return summary
     
     def process_notifications(self):
-        """Processar notificações pendentes"""
+        """Enfileirar notificações pendentes para a thread de envio"""
         unnotified = self.db.get_unnotified_listings()
         
-        if unnotified:
-            self.logger.info(f"📢 Enviando {len(unnotified)} notificações pendentes")
+        # Ignorar anúncios que ainda estão na fila do ciclo anterior
+        with self._notif_lock:
+            queued = [listing for listing in unnotified
+                      if listing['id'] not in self._notif_pending]
+            self._notif_pending.update(listing['id'] for listing in queued)
+        
+        if queued:
+            self.logger.info(f"📢 Enviando {len(queued)} notificações pendentes")
+            
+            self._start_workers()
+            for listing in queued:
+                self._notif_queue.put(listing)
+    
+    def _notif_worker(self, queue: Queue):
+        """Consumir a fila de notificações até receber o sentinela (None)"""
+        running = True
+        while running:
+            # Bloquear pelo primeiro item e juntar o que mais já estiver na fila
+            batch = [queue.get()]
+            while len(batch) < _NOTIF_BATCH_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+            
+            if None in batch:
+                running = False
+                batch = [listing for listing in batch if listing is not None]
+            if not batch:
+                continue
+            
+            # Cada notificador recebe o lote inteiro (uma escrita por lote)
+            # e o lote é marcado como notificado com um único UPDATE
+            try:
+                results = self.notification_manager.send_notifications(batch)
+            except Exception as e:
+                self.logger.error(f"Erro ao notificar lote de {len(batch)} anúncios: {e}")
+                results = [None] * len(batch)
             
-            for listing in unnotified:
-                try:
-                    # Enviar notificação
-                    self.notification_manager.send_notification(listing)
-                    
-                    # Marcar como notificado
-                    self.db.mark_listing_notified(listing['id'])
-                    
-                except Exception as e:
-                    self.logger.error(f"Erro ao notificar anúncio {listing['id']}: {e}")
+            # Marcar só os anúncios que algum notificador entregou (ou sem
+            # notificadores configurados); os demais voltam no próximo ciclo
+            delivered = [
+                listing['id'] for listing, listing_results in zip(batch, results)
+                if listing_results is not None and (
+                    not listing_results
+                    or any(result.get('success') for result in listing_results.values())
+                )
+            ]
+            try:
+                if delivered:
+                    self.db.mark_listings_notified_bulk(delivered)
+                if len(delivered) < len(batch):
+                    self.logger.warning(f"{len(batch) - len(delivered)} notificações não entregues; "
+                                        f"nova tentativa no próximo ciclo")
+            except Exception as e:
+                self.logger.error(f"Erro ao marcar lote de {len(batch)} anúncios como notificado: {e}")
+            finally:
+                with self._notif_lock:
+                    self._notif_pending.difference_update(listing['id'] for listing in batch)
     
     def cleanup_old_data(self):
         """Limpeza de dados antigos"""
@@ -248,17 +361,20 @@ class MonitorService:
             
             total_new_listings = 0
             
+            # Cidades ativas carregadas uma vez por ciclo
+            cities = self.db.get_cities(active_only=True)
+            
             # Processar cada palavra-chave
             for keyword in keywords_to_check:
                 if self.stop_event.is_set():
                     break
                 
-                summary = self.process_keyword(keyword)
+                summary = self.process_keyword(keyword, cities)
                 total_new_listings += summary['total_new']
                 
-                # Delay entre palavras-chave
-                if not self.stop_event.is_set():
-                    time.sleep(5)
+                # Delay entre palavras-chave (interrompido imediatamente ao parar)
+                if self.stop_event.wait(5):
+                    break
             
             # Processar notificações
             if not self.stop_event.is_set():
@@ -293,6 +409,7 @@ class MonitorService:
         self.start_time = time.time()
         self.cycle_count = 0
         self.stop_event.clear()
+        self._start_workers()
         
         # Log de configurações iniciais
         self.logger.info(f"Configurações: intervalo padrão {self.config['check_interval_default']}s")
@@ -305,10 +422,8 @@ class MonitorService:
                 # Aguardar próximo ciclo (mínimo 30 segundos)
                 sleep_time = max(30, self.config['check_interval_default'] // 4)
                 
-                for _ in range(sleep_time):
-                    if self.stop_event.is_set():
-                        break
-                    time.sleep(1)
+                if self.stop_event.wait(sleep_time):
+                    break
         
         except KeyboardInterrupt:
             self.logger.info("Interrupção por teclado recebida")
@@ -331,9 +446,12 @@ class MonitorService:
         """Limpeza final"""
         self.logger.info("🧹 Executando limpeza final...")
         
-        # Fechar driver do scraper
-        if self.scraper:
-            self.scraper.close_driver()
+        # Aguardar verificações em andamento, esvaziar a fila de notificações
+        # e encerrar as threads (start() as recria); depois fechar os drivers
+        self._stop_workers()
+        for scraper in self.scrapers:
+            scraper.close_driver()
+        self.notification_manager.close()
         
         # Estatísticas finais
         if hasattr(self, 'start_time'):
@@ -341,4 +459,5 @@ class MonitorService:
             self.logger.info(f"⏱️  Tempo total de execução: {uptime}")
         
         self.logger.info("✅ Serviço finalizado")
+        self.logger.flush()
         self.running = False
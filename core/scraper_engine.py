@@ -6,6 +6,10 @@ Usa a URL da API do Facebook para buscar anúncios mais recentes
 import time
 import re
 import json
+import sqlite3
+import os
+import atexit
+import threading
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from selenium import webdriver
@@ -14,17 +18,103 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
+from bs4 import BeautifulSoup
+from urllib.parse import urljoin, urlencode, quote
+from functools import lru_cache
 
 from .db_manager import DatabaseManager
 from utils.logger import get_logger
 
+# Rola até document.body.scrollHeight ficar estável por 2 leituras seguidas
+# (ou até max_scrolls aumentos de altura) e retorna quantos aumentos ocorreram
+_SCROLL_JS = """
+const maxScrolls = arguments[0];
+const done = arguments[arguments.length - 1];
+let last = document.body.scrollHeight, stable = 0, scrolls = 0;
+const iv = setInterval(() => {
+    window.scrollTo(0, document.body.scrollHeight);
+    const h = document.body.scrollHeight;
+    if (h === last) {
+        if (++stable >= 2) { clearInterval(iv); done(scrolls); }
+    } else {
+        stable = 0;
+        last = h;
+        if (++scrolls >= maxScrolls) { clearInterval(iv); done(scrolls); }
+    }
+}, 400);
+"""
+
+# Padrões usados na extração dos anúncios (compilados uma única vez)
+_ITEM_PATH = '/marketplace/item/'
+_LISTING_SELECTOR = 'a[href*="/marketplace/item/"]'
+_LOGIN_FORM_SELECTOR = 'form[action*="login"], input[name="pass"]'
+_PRICE_PREFIX_RE = re.compile(r'^(US\$|R\$|€|\$)\d+')
+_DISTANCE_RE = re.compile(r'^\d+\s*(km|mi|miles)', re.IGNORECASE)
+_PRICE_ANY_RE = re.compile(r'(US\$|R\$|€|\$)\s*[\d,]+')
+_LOCATION_RE = re.compile(r'\b(SP|RJ|MG|São Paulo|Rio|Santo André|ABC|km)\b', re.IGNORECASE)
+
+# User agent realista, aplicado via argumento do Chrome
+_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+               "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36")
+
+# Base para resolver os hrefs relativos do page_source
+_FACEBOOK_URL = "https://www.facebook.com/"
+
+# Recursos que o scraper nunca usa (só precisa do atributo src das imagens,
+# não dos bytes): bloqueados via CDP para reduzir o tráfego por página.
+# CSS e JS ficam liberados, pois o scroll e o carregamento dos anúncios dependem deles
+_BLOCKED_URLS = [
+    "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*",
+    "*.woff*", "*.ttf*",
+    "*.mp4*", "*.webm*",
+    "*scontent*.fbcdn.net/*", "*video*.fbcdn.net/*",
+]
+
+# Cookies da sessão do Facebook, compartilhados entre navegadores e reinícios
+_COOKIES_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'facebook_cookies.json')
+_COOKIES_SAVE_INTERVAL = 3600  # segundos
+
+def _is_location_text(text: str) -> bool:
+    """Filtro de nós de texto para a localização do anúncio"""
+    text = text.strip()
+    return bool(text) and len(text) < 100 and bool(_LOCATION_RE.search(text))
+
+@lru_cache(maxsize=1024)
+def _marketplace_url(city_slug: str, keyword: Optional[str], category: Optional[str]) -> str:
+    """URL de busca do Marketplace (pura, então memoizada por cidade/keyword/categoria)"""
+    base_url = f"https://www.facebook.com/marketplace/{city_slug}"
+    
+    # Se há palavra-chave, usar /search/, senão usar categoria específica
+    if keyword:
+        base_url += "/search"
+    elif category:
+        base_url += f"/{category}"
+    
+    # Parâmetros para buscar mais recentes
+    params = {
+        "sortBy": "creation_time_descend",  # Ordenar por mais recentes
+        "exact": "false"
+    }
+    if keyword:
+        params = {"query": keyword, **params}
+    
+    return f"{base_url}?{urlencode(params, quote_via=quote)}"
+
 class ScraperEngine:
+    # Os engines do pool resolvem o chromedriver ao mesmo tempo no primeiro ciclo:
+    # um install() por vez, os demais reaproveitam o caminho gravado
+    _chromedriver_lock = threading.Lock()
+    
     def __init__(self, db_manager: DatabaseManager, logger=None):
         self.db = db_manager
         self.logger = logger or get_logger("ScraperEngine", db_manager)
         self.driver = None
+        self._cookies_saved_at = 0.0
+        
+        # Fechar o navegador no encerramento do processo (em vez de __del__)
+        atexit.register(self.close_driver)
         
         # Configurações do scraper
         self.config = {
@@ -32,7 +122,8 @@ class ScraperEngine:
             'timeout': self.db.get_config('timeout_request', 30),
             'max_retries': self.db.get_config('max_retries', 3),
             'max_listings': self.db.get_config('max_listings_per_check', 50),
-            'show_browser_logs': self.db.get_config('show_browser_logs', False)  # Não mostrar logs do Chrome por padrão
+            'show_browser_logs': self.db.get_config('show_browser_logs', False),  # Não mostrar logs do Chrome por padrão
+            'block_media': self.db.get_config('block_browser_media', True)  # Não baixar imagens/fontes/vídeos
         }
     
     def setup_driver(self) -> webdriver.Chrome:
@@ -42,6 +133,10 @@ class ScraperEngine:
         if self.config['headless']:
             chrome_options.add_argument("--headless")
         
+        # Não esperar imagens/subrecursos: get() retorna no DOMContentLoaded,
+        # e os anúncios são aguardados explicitamente com WebDriverWait
+        chrome_options.page_load_strategy = 'eager'
+        
         # Configurações para performance e stealth
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
@@ -53,9 +148,6 @@ class ScraperEngine:
             chrome_options.add_argument("--disable-logging")
             chrome_options.add_argument("--log-level=3")
             chrome_options.add_argument("--silent")
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-logging"])
-            chrome_options.add_experimental_option("useAutomationExtension", False)
-        chrome_options.add_argument("--silent")
         chrome_options.add_argument("--window-size=1920,1080")
         
         # Anti-detecção
@@ -64,10 +156,7 @@ class ScraperEngine:
         chrome_options.add_experimental_option('useAutomationExtension', False)
         
         # User agent realista
-        chrome_options.add_argument(
-            "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-            "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-        )
+        chrome_options.add_argument(f"--user-agent={_USER_AGENT}")
         
         try:
             # Configurar argumentos do service
@@ -76,7 +165,7 @@ class ScraperEngine:
                 service_args.append('--silent')
             
             service = Service(
-                ChromeDriverManager().install(),
+                self._chromedriver_path(),
                 log_path='NUL' if not self.config['show_browser_logs'] else None,
                 service_args=service_args
             )
@@ -85,9 +174,14 @@ class ScraperEngine:
             
             # Configurações anti-detecção
             driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-                "userAgent": chrome_options.arguments[-1].split('=', 1)[1]
-            })
+            
+            # Bloquear imagens, fontes e vídeos (o src das <img> continua no DOM)
+            if self.config['block_media']:
+                try:
+                    driver.execute_cdp_cmd('Network.enable', {})
+                    driver.execute_cdp_cmd('Network.setBlockedURLs', {"urls": _BLOCKED_URLS})
+                except WebDriverException as e:
+                    self.logger.warning(f"Não foi possível bloquear recursos via CDP: {e}")
             
             # Configurar timeouts
             driver.set_page_load_timeout(self.config['timeout'])
@@ -98,69 +192,51 @@ class ScraperEngine:
         except Exception as e:
             self.logger.error(f"Erro ao configurar driver Chrome: {e}")
             raise
-            driver.implicitly_wait(10)
-            
-            return driver
-            
-        except Exception as e:
-            self.logger.error(f"Erro ao configurar driver: {e}")
-            raise
+    
+    def _chromedriver_path(self) -> str:
+        """Caminho do chromedriver, resolvido pelo webdriver_manager só quando não há cache válido"""
+        with ScraperEngine._chromedriver_lock:
+            driver_path = self.db.get_config('chromedriver_path')
+            if driver_path and os.path.isfile(driver_path):
+                return driver_path
+            
+            driver_path = ChromeDriverManager().install()
+            self.db.set_config('chromedriver_path', driver_path,
+                               'Caminho do chromedriver resolvido pelo webdriver_manager')
+            return driver_path
     
     def build_marketplace_url(self, city_slug: str, keyword: str = None, 
                              category: str = "vehicles") -> str:
         """Construir URL do Facebook Marketplace"""
-        base_url = f"https://www.facebook.com/marketplace/{city_slug}"
-        
-        # Se há palavra-chave, usar /search/, senão usar categoria específica
-        if keyword:
-            base_url += "/search"
-        elif category:
-            base_url += f"/{category}"
-        
-        # Parâmetros para buscar mais recentes
-        params = [
-            "sortBy=creation_time_descend",  # Ordenar por mais recentes
-            "exact=false"
-        ]
-        
-        if keyword:
-            # Codificar keyword para URL
-            import urllib.parse
-            encoded_keyword = urllib.parse.quote(keyword)
-            params.insert(0, f"query={encoded_keyword}")
-        
-        if params:
-            base_url += "?" + "&".join(params)
-        
-        return base_url
+        return _marketplace_url(city_slug, keyword, category)
     
     def extract_facebook_id_from_url(self, url: str) -> Optional[str]:
         """Extrair ID do Facebook da URL do anúncio"""
-        # Padrão: /marketplace/item/1234567890/
-        match = re.search(r'/marketplace/item/(\d+)/', url)
-        if match:
-            return match.group(1)
-        return None
+        # Padrão: /marketplace/item/1234567890/ (busca de substring, sem regex)
+        start = url.find(_ITEM_PATH)
+        if start < 0:
+            return None
+        start += len(_ITEM_PATH)
+        end = url.find('/', start)
+        item_id = url[start:end]
+        return item_id if end > start and item_id.isdigit() else None
     
     def extract_listing_data(self, listing_element) -> Optional[Dict[str, Any]]:
-        """Extrair dados de um elemento de anúncio"""
+        """Extrair dados de um anúncio a partir do HTML já parseado (Tag do BeautifulSoup)"""
         try:
-            # Scroll para o elemento
-            self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", listing_element)
-            time.sleep(0.3)
-            
             data = {}
             
             # URL e ID do Facebook
             try:
-                if listing_element.tag_name == 'a':
-                    url = listing_element.get_attribute('href')
+                if listing_element.name == 'a':
+                    href = listing_element.get('href')
                 else:
-                    link_elem = listing_element.find_element(By.CSS_SELECTOR, "a")
-                    url = link_elem.get_attribute('href')
+                    link_elem = listing_element.find('a', href=True)
+                    href = link_elem.get('href') if link_elem else None
                 
+                url = urljoin(_FACEBOOK_URL, href) if href else None
                 data['url'] = url
-                data['facebook_id'] = self.extract_facebook_id_from_url(url)
+                data['facebook_id'] = self.extract_facebook_id_from_url(url) if url else None
                 
                 if not data['facebook_id']:
                     return None
@@ -179,13 +255,12 @@ class ScraperEngine:
             data['title'] = None
             for selector in title_selectors:
                 try:
-                    elements = listing_element.find_elements(By.CSS_SELECTOR, selector)
-                    for elem in elements:
-                        text = elem.text.strip()
+                    for elem in listing_element.select(selector):
+                        text = elem.get_text(' ', strip=True)
                         # Verificar se é um título válido (não é só preço ou localização)
                         if (text and len(text) > 5 and 
-                            not re.match(r'^(US\$|R\$|€|\$)\d+', text) and
-                            not re.match(r'^\d+\s*(km|mi|miles)', text.lower())):
+                            not _PRICE_PREFIX_RE.match(text) and
+                            not _DISTANCE_RE.match(text)):
                             data['title'] = text[:200]  # Limitar tamanho
                             break
                     if data['title']:
@@ -193,48 +268,22 @@ class ScraperEngine:
                 except Exception:
                     continue
             
-            # Preço
-            price_selectors = [
-                'span:contains("$")',
-                'span:contains("R$")',
-                'div:contains("$")'
-            ]
+            # Preço: primeiro nó de texto com símbolo de moeda (o filtro roda
+            # na busca, sem montar o texto de cada span/div)
+            price_node = listing_element.find(string=_PRICE_ANY_RE)
+            data['price'] = price_node.strip()[:50] if price_node else None  # Limitar tamanho
             
-            data['price'] = None
-            try:
-                # Buscar por elementos que contêm símbolos de moeda
-                all_spans = listing_element.find_elements(By.CSS_SELECTOR, "span, div")
-                for span in all_spans:
-                    text = span.text.strip()
-                    if re.search(r'(US\$|R\$|€|\$)\s*[\d,]+', text):
-                        data['price'] = text[:50]  # Limitar tamanho
-                        break
-            except Exception:
-                pass
-            
-            # Localização (tentar extrair de textos menores)
-            data['location'] = None
-            try:
-                all_elements = listing_element.find_elements(By.CSS_SELECTOR, "span, div")
-                for elem in all_elements:
-                    text = elem.text.strip()
-                    # Procurar por padrões de localização brasileira
-                    if (text and len(text) < 100 and 
-                        re.search(r'\b(SP|RJ|MG|São Paulo|Rio|Santo André|ABC|km)\b', text, re.IGNORECASE)):
-                        data['location'] = text
-                        break
-            except Exception:
-                pass
+            # Localização: primeiro texto curto com padrão de localização brasileira
+            location_node = listing_element.find(string=_is_location_text)
+            data['location'] = location_node.strip() if location_node else None
             
             # Imagem
             data['image_url'] = None
-            try:
-                img_elem = listing_element.find_element(By.CSS_SELECTOR, "img")
-                src = img_elem.get_attribute('src')
+            img_elem = listing_element.find('img')
+            if img_elem:
+                src = img_elem.get('src')
                 if src and src.startswith('http'):
                     data['image_url'] = src
-            except Exception:
-                pass
             
             # Validar dados mínimos
             if not data.get('facebook_id') or not data.get('url'):
@@ -267,9 +316,8 @@ class ScraperEngine:
         }
         
         try:
-            # Configurar driver se necessário
-            if not self.driver:
-                self.driver = self.setup_driver()
+            # Configurar (ou recriar) driver se necessário
+            self._ensure_driver()
             
             # Construir URL
             url = self.build_marketplace_url(city_slug, keyword, "vehicles")
@@ -277,25 +325,33 @@ class ScraperEngine:
             
             # Navegar para a página
             self.driver.get(url)
-            time.sleep(3)
-            
-            # Verificar se foi redirecionado para login
-            if "login" in self.driver.current_url.lower():
-                raise Exception("Redirecionado para login do Facebook")
             
-            # Aguardar carregamento da página
+            # Aguardar o primeiro sinal real da página: um anúncio renderizado ou o
+            # redirecionamento (feito via JS) para o login, em vez de um sleep fixo
             try:
-                WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, 'a[href*="/marketplace/item/"]'))
-                )
+                WebDriverWait(self.driver, 10).until(EC.any_of(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, _LISTING_SELECTOR)),
+                    EC.presence_of_element_located((By.CSS_SELECTOR, _LOGIN_FORM_SELECTOR)),
+                    EC.url_contains('login')
+                ))
             except TimeoutException:
                 self.logger.warning("Timeout aguardando anúncios")
             
+            # Verificar se foi redirecionado para login (URL ou formulário sem anúncios)
+            login_page = "login" in self.driver.current_url.lower() or (
+                not self.driver.find_elements(By.CSS_SELECTOR, _LISTING_SELECTOR)
+                and self.driver.find_elements(By.CSS_SELECTOR, _LOGIN_FORM_SELECTOR)
+            )
+            if login_page:
+                raise Exception("Redirecionado para login do Facebook")
+            
             # Scroll para carregar mais anúncios
             self.scroll_and_load()
             
-            # Encontrar todos os anúncios
-            listings = self.driver.find_elements(By.CSS_SELECTOR, 'a[href*="/marketplace/item/"]')
+            # Encontrar todos os anúncios: um único page_source parseado localmente
+            # em vez de uma ida ao navegador por elemento/atributo
+            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+            listings = soup.select(_LISTING_SELECTOR)
             result['listings_found'] = len(listings)
             
             if not listings:
@@ -307,44 +363,31 @@ class ScraperEngine:
             
             # Processar anúncios limitados
             max_to_process = min(len(listings), self.config['max_listings'])
-            new_listings = 0
             
+            # Passo 1: extrair os dados de todos os anúncios
+            extracted = {}
             for i, listing in enumerate(listings[:max_to_process]):
                 try:
                     data = self.extract_listing_data(listing)
-                    
                     if data and data.get('facebook_id'):
-                        # Verificar se já existe no banco
-                        if not self.db.listing_exists(data['facebook_id']):
-                            # Adicionar novo anúncio
-                            listing_id = self.db.add_listing(
-                                facebook_id=data['facebook_id'],
-                                title=data.get('title', ''),
-                                price=data.get('price', ''),
-                                url=data['url'],
-                                description=None,  # Pode ser expandido depois
-                                location=data.get('location', ''),
-                                image_url=data.get('image_url', ''),
-                                city_id=city_id,
-                                keyword_id=keyword_id
-                            )
-                            
-                            new_listings += 1
-                            self.logger.info(f"Novo anúncio: {data['title'][:50]}...")
-                            
-                        # Delay entre processamentos
-                        time.sleep(0.5)
-                        
+                        extracted.setdefault(data['facebook_id'], data)
                 except Exception as e:
                     result['errors'] += 1
                     self.logger.debug(f"Erro ao processar anúncio {i+1}: {e}")
-                    continue
+            
+            # Passo 2: uma consulta para os já existentes e uma gravação em lote
+            existing = self.db.existing_ids(list(extracted))
+            new_data = [data for fid, data in extracted.items() if fid not in existing]
+            new_listings = self._save_new_listings(new_data, city_id, keyword_id)
             
             result['new_listings'] = new_listings
             result['success'] = True
             
             self.logger.info(f"Concluído: {new_listings} novos de {result['listings_found']} anúncios")
             
+            if time.time() - self._cookies_saved_at >= _COOKIES_SAVE_INTERVAL:
+                self._save_cookies()
+            
         except Exception as e:
             result['error_message'] = str(e)
             result['errors'] += 1
@@ -366,37 +409,99 @@ class ScraperEngine:
         
         return result
     
+    def _save_new_listings(self, new_data: List[Dict[str, Any]], city_id: int, 
+                           keyword_id: int) -> int:
+        """Gravar anúncios novos numa única transação; retorna quantos foram gravados"""
+        rows = [
+            (data['facebook_id'], data.get('title', ''), data.get('price', ''), data['url'],
+             None,  # description: pode ser expandido depois
+             data.get('location', ''), data.get('image_url', ''), city_id, keyword_id)
+            for data in new_data
+        ]
+        
+        try:
+            self.db.add_listings_bulk(rows)
+            saved = new_data
+        except sqlite3.IntegrityError:
+            # Outro navegador gravou algum destes anúncios nesse meio tempo
+            saved = [
+                data for data, row in zip(new_data, rows)
+                if self.db.try_add_listing(
+                    facebook_id=row[0], title=row[1], price=row[2], url=row[3],
+                    description=row[4], location=row[5], image_url=row[6],
+                    city_id=city_id, keyword_id=keyword_id
+                )
+            ]
+        
+        for data in saved:
+            self.logger.info(f"Novo anúncio: {data['title'][:50]}...")
+        return len(saved)
+    
     def scroll_and_load(self, max_scrolls: int = 3):
-        """Fazer scroll para carregar mais anúncios"""
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
+        """Fazer scroll para carregar mais anúncios (uma única chamada ao navegador)"""
+        # O próprio navegador rola até a altura estabilizar (ou max_scrolls
+        # carregamentos) e só então devolve o resultado
+        scrolls = self.driver.execute_async_script(_SCROLL_JS, max_scrolls)
+        self.logger.debug(f"Scroll concluído: {scrolls}/{max_scrolls} carregamentos")
+    
+    def _driver_healthy(self) -> bool:
+        """Verificar se o navegador ainda responde"""
+        try:
+            self.driver.current_url
+            return True
+        except WebDriverException:
+            return False
+    
+    def _ensure_driver(self):
+        """Reaproveitar o driver aberto, recriando-o se o navegador tiver caído"""
+        if self.driver and not self._driver_healthy():
+            self.logger.warning("Navegador não responde; recriando driver")
+            self.close_driver()
         
-        for i in range(max_scrolls):
-            # Scroll para baixo
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-            
-            # Verificar se carregou mais conteúdo
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
-            
-            if new_height == last_height:
-                break
-            
-            last_height = new_height
-            self.logger.debug(f"Scroll {i+1}/{max_scrolls} completado")
+        if not self.driver:
+            self.driver = self.setup_driver()
+            self._load_cookies()
+    
+    def _load_cookies(self):
+        """Restaurar cookies salvos da sessão do Facebook"""
+        if not os.path.exists(_COOKIES_PATH):
+            return
+        
+        try:
+            with open(_COOKIES_PATH, 'r', encoding='utf-8') as f:
+                cookies = json.load(f)
+            
+            # Cookies só podem ser definidos estando no domínio
+            self.driver.get("https://www.facebook.com/")
+            for cookie in cookies:
+                self.driver.add_cookie(cookie)
+            self.logger.debug(f"{len(cookies)} cookies restaurados")
+        except Exception as e:
+            self.logger.warning(f"Erro ao restaurar cookies: {e}")
+    
+    def _save_cookies(self):
+        """Salvar cookies da sessão atual (escrita atômica)"""
+        try:
+            cookies = self.driver.get_cookies()
+            tmp_path = f"{_COOKIES_PATH}.{os.getpid()}.{id(self)}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cookies, f)
+            os.replace(tmp_path, _COOKIES_PATH)
+            self._cookies_saved_at = time.time()
+        except Exception as e:
+            self.logger.debug(f"Erro ao salvar cookies: {e}")
     
     def close_driver(self):
         """Fechar driver do navegador"""
         if self.driver:
+            self._save_cookies()
             try:
                 self.driver.quit()
-                self.driver = None
                 self.logger.debug("Driver fechado")
             except Exception as e:
                 self.logger.warning(f"Erro ao fechar driver: {e}")
-    
-    def __del__(self):
-        """Destructor para garantir que o driver seja fechado"""
-        self.close_driver()
+            finally:
+                self.driver = None
     
     def check_keyword_city_combination(self, keyword: Dict[str, Any], city: Dict[str, Any]) -> Dict[str, Any]:
         """Método para testar uma combinação específica de palavra-chave e cidade"""
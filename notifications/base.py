@@ -4,45 +4,94 @@ Define a interface comum para todos os tipos de notificação
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
+# Limite de threads para enviar aos notificadores em paralelo
+_MAX_NOTIFIER_THREADS = 8
+
+def _unique_listings(listings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Remover anúncios repetidos (mesmo facebook_id, ou id), mantendo a primeira ocorrência"""
+    seen = set()
+    unique = []
+    for listing in listings:
+        key = listing.get('facebook_id') or listing.get('id')
+        if key is None or key not in seen:
+            seen.add(key)
+            unique.append(listing)
+    return unique
+
+@dataclass
 class NotificationData:
-    """Classe para dados de notificação"""
-    def __init__(self, listing: Dict[str, Any]):
-        self.listing = listing
-        self.timestamp = datetime.now()
+    """Dados de notificação, extraídos do anúncio uma única vez (from_listing)"""
+    
+    # Declarado à mão (dataclass(slots=True) exige Python 3.10)
+    __slots__ = ('listing', 'timestamp', 'id', 'facebook_id', 'keyword', 'city',
+                 'title', 'price', 'url', 'location', 'found_at')
+    
+    listing: Dict[str, Any]
+    timestamp: datetime
+    id: Optional[int]
+    facebook_id: Optional[str]
+    keyword: str
+    city: str
+    title: str
+    price: str
+    url: str
+    location: str
+    found_at: str
+    
+    @classmethod
+    def from_listing(cls, listing: Dict[str, Any]) -> 'NotificationData':
+        """Criar a partir de um anúncio (dict com keyword_term e city_name)"""
+        get = listing.get
+        return cls(
+            listing=listing,
+            timestamp=datetime.now(),
+            id=get('id'),
+            facebook_id=get('facebook_id'),
+            keyword=get('keyword_term', ''),
+            city=get('city_name', ''),
+            title=get('title', ''),
+            price=get('price', ''),
+            url=get('url', ''),
+            location=get('location', ''),
+            found_at=get('found_at', '')
+        )
         
     def to_dict(self) -> Dict[str, Any]:
         """Converter para dicionário"""
         return {
             'type': 'new_listing',
             'timestamp': self.timestamp.isoformat(),
-            'keyword': self.listing.get('keyword_term', ''),
-            'city': self.listing.get('city_name', ''),
+            'keyword': self.keyword,
+            'city': self.city,
             'listing': {
-                'id': self.listing.get('id'),
-                'facebook_id': self.listing.get('facebook_id'),
-                'title': self.listing.get('title', ''),
-                'price': self.listing.get('price', ''),
-                'url': self.listing.get('url', ''),
-                'location': self.listing.get('location', ''),
-                'found_at': self.listing.get('found_at', '')
+                'id': self.id,
+                'facebook_id': self.facebook_id,
+                'title': self.title,
+                'price': self.price,
+                'url': self.url,
+                'location': self.location,
+                'found_at': self.found_at
             }
         }
         
     def get_summary(self) -> str:
         """Obter resumo da notificação"""
-        title = self.listing.get('title', 'Sem título')
-        price = self.listing.get('price', 'Preço não informado')
-        keyword = self.listing.get('keyword_term', '')
-        city = self.listing.get('city_name', '')
+        title = self.title or 'Sem título'
+        price = self.price or 'Preço não informado'
         
-        return f"🔔 Novo anúncio para '{keyword}' em {city}: {title} - {price}"
+        return f"🔔 Novo anúncio para '{self.keyword}' em {self.city}: {title} - {price}"
 
 class BaseNotifier(ABC):
     """Classe base para notificadores"""
     
+    # Subclasses declaram os próprios __slots__; enabled é lido direto como atributo
+    __slots__ = ('config', 'enabled')
+    
     def __init__(self, config: Dict[str, Any] = None):
         self.config = config or {}
         self.enabled = self.config.get('enabled', True)
@@ -57,14 +106,32 @@ class BaseNotifier(ABC):
         """
         pass
     
+    def send_many(self, notifications: List[NotificationData]) -> List[Dict[str, Any]]:
+        """
+        Enviar um lote de notificações
+        
+        Padrão: uma chamada de send() por item; notificadores com I/O
+        sobrescrevem para fazer uma única escrita por lote.
+        
+        Returns:
+            Lista de resultados (mesmo formato de send), na ordem do lote
+        """
+        return [self.send(notification_data) for notification_data in notifications]
+    
     @abstractmethod
     def get_type(self) -> str:
         """Obter tipo do notificador"""
         pass
     
-    def is_enabled(self) -> bool:
-        """Verificar se notificador está habilitado"""
-        return self.enabled
+    def close(self):
+        """Liberar recursos do notificador (arquivos, conexões)"""
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
     
     def format_message(self, notification_data: NotificationData) -> str:
         """Formatar mensagem básica"""
@@ -77,72 +144,119 @@ class NotificationManager:
         self.db_manager = db_manager
         self.logger = logger
         self.notifiers: List[BaseNotifier] = []
+        # Pares (notificador, tipo) com get_type() resolvido no registro
+        self._notifiers: Tuple[Tuple[BaseNotifier, str], ...] = ()
+        self._pool: Optional[ThreadPoolExecutor] = None  # criado no primeiro envio
         
     def add_notifier(self, notifier: BaseNotifier):
         """Adicionar notificador"""
-        if notifier.is_enabled():
+        if notifier.enabled:
             self.notifiers.append(notifier)
+            self._notifiers += ((notifier, notifier.get_type()),)
             self.logger.info(f"Notificador {notifier.get_type()} adicionado")
         else:
             self.logger.info(f"Notificador {notifier.get_type()} desabilitado")
     
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Pool de threads dos envios (um worker por notificador, até o limite)"""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=min(_MAX_NOTIFIER_THREADS, len(self.notifiers)),
+                thread_name_prefix="Notifier"
+            )
+        return self._pool
+    
+    def shutdown(self):
+        """Encerrar o pool de threads dos envios"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+    
+    def close(self):
+        """Encerrar o pool e fechar todos os notificadores"""
+        self.shutdown()
+        for notifier, notifier_type in self._notifiers:
+            try:
+                notifier.close()
+            except Exception as e:
+                self.logger.error(f"Erro ao fechar notificador {notifier_type}: {e}")
+    
     def send_notification(self, listing: Dict[str, Any]) -> Dict[str, Any]:
         """Enviar notificação para todos os notificadores"""
-        notification_data = NotificationData(listing)
-        results = {}
+        return self.send_notifications([listing])[0]
+    
+    def send_notifications(self, listings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Enviar um lote de notificações: cada notificador recebe o lote inteiro
+        
+        Os resultados são gravados no banco com um único INSERT em lote.
+        
+        Returns:
+            Lista com os resultados por notificador de cada anúncio (mesmo
+            formato de send_notification), na ordem de listings
+        """
+        batch = [NotificationData.from_listing(listing) for listing in listings]
+        results = [{} for _ in batch]
+        rows = []
         
-        for notifier in self.notifiers:
+        # Notificadores fazem I/O bloqueante: enviar a todos em paralelo e
+        # manter a gravação dos resultados nesta thread
+        if len(self._notifiers) > 1:
+            pool = self._get_pool()
+            futures = [pool.submit(notifier.send_many, batch) for notifier, _ in self._notifiers]
+        else:
+            futures = None
+        
+        for index, (notifier, notifier_type) in enumerate(self._notifiers):
             try:
-                result = notifier.send(notification_data)
-                results[notifier.get_type()] = result
-                
-                # Salvar no banco de dados
-                notification_id = self.db_manager.add_notification(
-                    listing_id=listing['id'],
-                    notification_type=notifier.get_type(),
-                    message=notification_data.get_summary(),
-                    status='pending'
-                )
-                
-                # Atualizar status
-                if result.get('success'):
-                    self.db_manager.update_notification_status(
-                        notification_id, 'sent'
-                    )
-                    self.logger.log_notification_sent(
-                        notifier.get_type(), 
-                        listing.get('title', ''), 
-                        True
-                    )
+                if futures is None:
+                    notifier_results = notifier.send_many(batch)
                 else:
-                    self.db_manager.update_notification_status(
-                        notification_id, 'failed', result.get('error')
-                    )
-                    self.logger.log_notification_sent(
-                        notifier.get_type(), 
-                        listing.get('title', ''), 
-                        False, 
-                        result.get('error')
-                    )
-                    
+                    notifier_results = futures[index].result()
             except Exception as e:
-                error_msg = f"Erro no notificador {notifier.get_type()}: {e}"
-                results[notifier.get_type()] = {
-                    'success': False,
-                    'error': error_msg
-                }
+                error_msg = f"Erro no notificador {notifier_type}: {e}"
                 self.logger.error(error_msg)
+                for listing_results in results:
+                    listing_results[notifier_type] = {'success': False, 'error': error_msg}
+                continue
+            
+            for notification_data, listing_results, result in zip(batch, results, notifier_results):
+                listing_results[notifier_type] = result
+                # O envio já aconteceu: um anúncio com dados inesperados não
+                # pode impedir o registro dos demais
+                try:
+                    listing = notification_data.listing
+                    success = bool(result.get('success'))
+                    error = None if success else result.get('error')
+                    
+                    rows.append((
+                        listing['id'], notifier_type, notification_data.get_summary(),
+                        'sent' if success else 'failed', error
+                    ))
+                    self.logger.log_notification_sent(
+                        notifier_type,
+                        listing.get('title') or '',
+                        success,
+                        error
+                    )
+                except Exception as e:
+                    self.logger.error(f"Erro ao registrar notificação {notifier_type}: {e}")
+        
+        # Salvar no banco de dados (uma transação para o lote todo)
+        try:
+            self.db_manager.add_notifications_bulk(rows)
+        except Exception as e:
+            self.logger.error(f"Erro ao registrar {len(rows)} notificações no banco: {e}")
         
         return results
     
     def send_batch_notifications(self, listings: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Enviar notificações em lote"""
+        """Enviar notificações em lote (um envio por facebook_id)"""
         total_sent = 0
         total_failed = 0
         
-        for listing in listings:
-            results = self.send_notification(listing)
-            
+        listings = _unique_listings(listings)
+        for results in self.send_notifications(listings):
             # Contar sucessos e falhas
             for result in results.values():
                 if result.get('success'):
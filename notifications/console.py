@@ -3,124 +3,123 @@ Notificador para console
 Exibe notificações coloridas no terminal
 """
 
-import json
-from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Final
 from .base import BaseNotifier, NotificationData
 
+# Códigos de cores ANSI (chaves já em maiúsculas)
+COLORS: Final[Dict[str, str]] = {
+    'HEADER': '\033[95m',
+    'BLUE': '\033[94m',
+    'CYAN': '\033[96m',
+    'GREEN': '\033[92m',
+    'YELLOW': '\033[93m',
+    'RED': '\033[91m',
+    'BOLD': '\033[1m',
+    'UNDERLINE': '\033[4m',
+    'RESET': '\033[0m'
+}
+
 class ConsoleNotifier(BaseNotifier):
     """Notificador que exibe mensagens no console"""
     
-    # Códigos de cores ANSI
-    COLORS = {
-        'HEADER': '\033[95m',
-        'BLUE': '\033[94m',
-        'CYAN': '\033[96m',
-        'GREEN': '\033[92m',
-        'YELLOW': '\033[93m',
-        'RED': '\033[91m',
-        'BOLD': '\033[1m',
-        'UNDERLINE': '\033[4m',
-        'RESET': '\033[0m'
-    }
+    __slots__ = ('show_details', 'use_colors', '_c_reset', '_c_blue', '_c_cyan',
+                 '_c_green', '_c_yellow', '_c_underline', '_c_header', '_c_sep',
+                 '_detailed_tpl')
+    
+    COLORS = COLORS
     
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.show_details = self.config.get('show_details', True)
         self.use_colors = self.config.get('use_colors', True)
+        
+        # Códigos de cor resolvidos uma vez (vazios sem cores) e trechos fixos já coloridos
+        codes = COLORS if self.use_colors else dict.fromkeys(COLORS, '')
+        self._c_reset = codes['RESET']
+        self._c_blue = codes['BLUE']
+        self._c_cyan = codes['CYAN']
+        self._c_green = codes['GREEN']
+        self._c_yellow = codes['YELLOW']
+        self._c_underline = codes['UNDERLINE']
+        self._c_header = f"{codes['BOLD']}🔔 NOVO ANÚNCIO ENCONTRADO{self._c_reset}"
+        self._c_sep = f"{self._c_cyan}{'=' * 60}{self._c_reset}"
+        
+        # Template da mensagem detalhada, montado uma vez (só os campos variam)
+        reset = self._c_reset
+        self._detailed_tpl = "\n".join([
+            "",
+            self._c_sep,
+            self._c_header,
+            self._c_sep,
+            f"{self._c_yellow}Palavra-chave: {{keyword}}{reset}",
+            f"{self._c_blue}Cidade: {{city}}{reset}",
+            f"{self._c_cyan}Encontrado em: {{timestamp}}{reset}",
+            "",
+            f"{self._c_green}Título: {{title}}{reset}",
+            f"{self._c_green}Preço: {{price}}{reset}",
+            "Localização: {location}",
+            "",
+            f"{self._c_underline}Link: {{url}}{reset}",
+            self._c_sep,
+            ""
+        ])
     
     def get_type(self) -> str:
         return "console"
     
     def colorize(self, text: str, color: str) -> str:
-        """Adicionar cor ao texto se habilitado"""
+        """Adicionar cor ao texto se habilitado (color: nome em maiúsculas, ex. 'YELLOW')"""
         if not self.use_colors:
             return text
         
-        color_code = self.COLORS.get(color.upper(), '')
-        reset_code = self.COLORS['RESET']
-        return f"{color_code}{text}{reset_code}"
+        return f"{COLORS[color]}{text}{self._c_reset}"
     
     def format_detailed_message(self, notification_data: NotificationData) -> str:
         """Formatar mensagem detalhada"""
-        listing = notification_data.listing
-        
-        # Cabeçalho
-        header = self.colorize("🔔 NOVO ANÚNCIO ENCONTRADO", "BOLD")
-        separator = self.colorize("=" * 60, "CYAN")
-        
-        # Informações principais
-        keyword = self.colorize(f"Palavra-chave: {listing.get('keyword_term', 'N/A')}", "YELLOW")
-        city = self.colorize(f"Cidade: {listing.get('city_name', 'N/A')}", "BLUE")
-        timestamp = self.colorize(f"Encontrado em: {notification_data.timestamp.strftime('%d/%m/%Y %H:%M:%S')}", "CYAN")
-        
-        # Detalhes do anúncio
-        title = self.colorize(f"Título: {listing.get('title', 'Sem título')}", "GREEN")
-        price = listing.get('price')
-        price_line = self.colorize(f"Preço: {price if price else 'Não informado'}", "GREEN")
-        
-        location = listing.get('location')
-        location_line = f"Localização: {location if location else 'Não informada'}"
-        
-        url = listing.get('url', '')
-        url_line = self.colorize(f"Link: {url}", "UNDERLINE")
-        
-        # Montar mensagem
-        lines = [
-            "",
-            separator,
-            header,
-            separator,
-            keyword,
-            city,
-            timestamp,
-            "",
-            title,
-            price_line,
-            location_line,
-            "",
-            url_line,
-            separator,
-            ""
-        ]
-        
-        return "\n".join(lines)
+        return self._detailed_tpl.format_map({
+            'keyword': notification_data.keyword or 'N/A',
+            'city': notification_data.city or 'N/A',
+            'timestamp': notification_data.timestamp.strftime('%d/%m/%Y %H:%M:%S'),
+            'title': notification_data.title or 'Sem título',
+            'price': notification_data.price or 'Não informado',
+            'location': notification_data.location or 'Não informada',
+            'url': notification_data.url
+        })
     
     def format_simple_message(self, notification_data: NotificationData) -> str:
         """Formatar mensagem simples"""
-        listing = notification_data.listing
-        
         # Emoji baseado no preço
-        price_emoji = "💰" if listing.get('price') else "📦"
+        price_emoji = "💰" if notification_data.price else "📦"
         
         # Informações básicas
-        keyword = listing.get('keyword_term', 'N/A')
-        city = listing.get('city_name', 'N/A')
-        title = listing.get('title', 'Sem título')[:50]
-        price = listing.get('price', 'Preço não informado')
+        keyword = notification_data.keyword or 'N/A'
+        city = notification_data.city or 'N/A'
+        title = notification_data.title or 'Sem título'
+        price = notification_data.price or 'Preço não informado'
         
-        if len(title) > 47:
-            title += "..."
+        # Títulos longos: cortados em 50 caracteres, incluindo as reticências
+        if len(title) > 50:
+            title = title[:47] + "..."
         
         # Formatar com cores
         time_str = notification_data.timestamp.strftime('%H:%M:%S')
-        time_colored = self.colorize(f"[{time_str}]", "CYAN")
-        keyword_colored = self.colorize(keyword, "YELLOW")
-        city_colored = self.colorize(city, "BLUE")
-        title_colored = self.colorize(title, "GREEN")
-        price_colored = self.colorize(price, "GREEN")
+        reset = self._c_reset
+        green = self._c_green
         
-        return f"{time_colored} {price_emoji} {keyword_colored} em {city_colored}: {title_colored} - {price_colored}"
+        return (f"{self._c_cyan}[{time_str}]{reset} {price_emoji} "
+                f"{self._c_yellow}{keyword}{reset} em {self._c_blue}{city}{reset}: "
+                f"{green}{title}{reset} - {green}{price}{reset}")
+    
+    def format_message(self, notification_data: NotificationData) -> str:
+        """Formatar mensagem conforme show_details"""
+        if self.show_details:
+            return self.format_detailed_message(notification_data)
+        return self.format_simple_message(notification_data)
     
     def send(self, notification_data: NotificationData) -> Dict[str, Any]:
         """Enviar notificação para o console"""
         try:
-            if self.show_details:
-                message = self.format_detailed_message(notification_data)
-            else:
-                message = self.format_simple_message(notification_data)
-            
-            print(message)
+            print(self.format_message(notification_data))
             
             return {
                 'success': True,
@@ -132,3 +131,24 @@ class ConsoleNotifier(BaseNotifier):
                 'success': False,
                 'error': f"Erro ao exibir no console: {e}"
             }
+    
+    def send_many(self, notifications: List[NotificationData]) -> List[Dict[str, Any]]:
+        """Exibir um lote de notificações com um único print"""
+        if not notifications:
+            return []
+        
+        try:
+            print("\n".join(self.format_message(notification_data)
+                            for notification_data in notifications))
+            result = {
+                'success': True,
+                'message': 'Notificação exibida no console'
+            }
+            
+        except Exception as e:
+            result = {
+                'success': False,
+                'error': f"Erro ao exibir no console: {e}"
+            }
+        
+        return [result] * len(notifications)
@@ -1,22 +1,39 @@
 """
 Notificador para arquivo
-Salva notificações em arquivos JSON ou texto
+Salva notificações em arquivos JSON Lines, JSON ou texto
 """
 
 import json
 import os
-from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
 from .base import BaseNotifier, NotificationData
 
+try:
+    import orjson  # opcional: serialização em C, já em bytes
+except ImportError:
+    orjson = None
+
+def _jsonl_line(data: Dict[str, Any]) -> bytes:
+    """Serializar um registro como linha JSON (UTF-8, compacta, com \\n)"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(data, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8')
+
 class FileNotifier(BaseNotifier):
     """Notificador que salva em arquivo"""
     
+    __slots__ = ('file_path', 'format', 'append_mode', 'fsync', '_fh')
+    
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
-        self.file_path = self.config.get('file_path', 'notifications.json')
-        self.format = self.config.get('format', 'json')  # json ou txt
-        self.append_mode = self.config.get('append_mode', True)
+        self.file_path = self.config.get('file_path', 'notifications.jsonl')
+        self.format = self.config.get('format', 'jsonl').lower()  # jsonl, json (legado) ou txt
+        self.append_mode = self.config.get('append_mode', True)  # False: só a última notificação
+        self.fsync = self.config.get('fsync', False)  # fsync por lote (durável, mais lento)
+        
+        # Handle (binário) dos formatos de acréscimo (jsonl e txt), aberto
+        # uma vez no primeiro envio; sem append_mode o arquivo é reescrito a cada envio
+        self._fh = None
         
         # Criar diretório se necessário
         os.makedirs(os.path.dirname(self.file_path) or '.', exist_ok=True)
@@ -27,7 +44,9 @@ class FileNotifier(BaseNotifier):
     def send(self, notification_data: NotificationData) -> Dict[str, Any]:
         """Salvar notificação em arquivo"""
         try:
-            if self.format.lower() == 'json':
+            if self.format == 'jsonl':
+                return self._save_jsonl_many([notification_data])
+            elif self.format == 'json':
                 return self._save_json(notification_data)
             else:
                 return self._save_text(notification_data)
@@ -38,30 +57,108 @@ class FileNotifier(BaseNotifier):
                 'error': f"Erro ao salvar em arquivo: {e}"
             }
     
+    def send_many(self, notifications: List[NotificationData]) -> List[Dict[str, Any]]:
+        """Salvar um lote de notificações com uma única abertura/escrita do arquivo"""
+        if not notifications:
+            return []
+        
+        try:
+            if self.format == 'jsonl':
+                result = self._save_jsonl_many(notifications)
+            elif self.format == 'json':
+                result = self._save_json_many(notifications)
+            else:
+                result = self._save_text_many(notifications)
+                
+        except Exception as e:
+            result = {
+                'success': False,
+                'error': f"Erro ao salvar em arquivo: {e}"
+            }
+        
+        return [result] * len(notifications)
+    
+    def _save_jsonl_many(self, notifications: List[NotificationData]) -> Dict[str, Any]:
+        """Acrescentar uma linha JSON por notificação (sem reler o arquivo)"""
+        if not self.append_mode:
+            notifications = notifications[-1:]
+        return self._append(b"".join(
+            _jsonl_line(notification_data.to_dict()) for notification_data in notifications
+        ))
+    
+    def _append(self, content: bytes) -> Dict[str, Any]:
+        """Escrever no handle persistente (aberto no primeiro uso) com um flush por lote"""
+        if not self.append_mode:
+            return self._replace(content)
+        
+        if self._fh is None:
+            self._fh = open(self.file_path, 'ab', buffering=65536)
+        
+        self._fh.write(content)
+        # Um flush por lote: o arquivo fica legível (tail -f) sem um write por linha
+        self._fh.flush()
+        self._sync(self._fh)
+        
+        return {
+            'success': True,
+            'message': f'Notificação salva em {self.file_path}'
+        }
+    
+    def _replace(self, content: bytes) -> Dict[str, Any]:
+        """Reescrever o arquivo inteiro com o conteúdo (append_mode desligado)"""
+        with open(self.file_path, 'wb') as f:
+            f.write(content)
+            self._sync(f)
+        
+        return {
+            'success': True,
+            'message': f'Notificação salva em {self.file_path}'
+        }
+    
+    def _sync(self, f):
+        """Forçar o lote para o disco, se configurado (um fsync por lote)"""
+        if self.fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def close(self):
+        """Fechar o arquivo, se aberto"""
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+    
     def _save_json(self, notification_data: NotificationData) -> Dict[str, Any]:
         """Salvar em formato JSON"""
-        data = notification_data.to_dict()
+        return self._save_json_many([notification_data])
+    
+    def _save_json_many(self, notifications: List[NotificationData]) -> Dict[str, Any]:
+        """Salvar lote em formato JSON legado (um único read-modify-write do arquivo)"""
+        records = [notification_data.to_dict() for notification_data in notifications]
         
-        if self.append_mode and os.path.exists(self.file_path):
-            # Ler arquivo existente
-            try:
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
+        if self.append_mode:
+            # Uma única abertura: lê o array existente (se houver) e reescreve
+            with open(self.file_path, 'a+', encoding='utf-8') as f:
+                f.seek(0)
+                try:
+                    existing_data = json.loads(f.read() or '[]')
                     if not isinstance(existing_data, list):
                         existing_data = [existing_data]
-            except (json.JSONDecodeError, FileNotFoundError):
-                existing_data = []
-            
-            # Adicionar nova notificação
-            existing_data.append(data)
-            
-            # Salvar arquivo atualizado
-            with open(self.file_path, 'w', encoding='utf-8') as f:
+                except json.JSONDecodeError:
+                    existing_data = []
+                
+                # Adicionar novas notificações
+                existing_data.extend(records)
+                
+                # Salvar arquivo atualizado
+                f.seek(0)
+                f.truncate()
                 json.dump(existing_data, f, ensure_ascii=False, indent=2)
+                self._sync(f)
         else:
-            # Salvar apenas a nova notificação
+            # Sem acréscimo o arquivo guarda só a última notificação (sempre um objeto)
             with open(self.file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+                json.dump(records[-1], f, ensure_ascii=False, indent=2)
+                self._sync(f)
         
         return {
             'success': True,
@@ -70,34 +167,34 @@ class FileNotifier(BaseNotifier):
     
     def _save_text(self, notification_data: NotificationData) -> Dict[str, Any]:
         """Salvar em formato texto"""
-        listing = notification_data.listing
-        
+        return self._save_text_many([notification_data])
+    
+    def _save_text_many(self, notifications: List[NotificationData]) -> Dict[str, Any]:
+        """Salvar lote em formato texto (uma única escrita)"""
+        if not self.append_mode:
+            notifications = notifications[-1:]
+        text_content = "".join(self._format_text(notification_data)
+                               for notification_data in notifications)
+        return self._append(text_content.encode('utf-8'))
+    
+    def _format_text(self, notification_data: NotificationData) -> str:
+        """Formatar uma notificação em texto"""
         # Formatar texto
         lines = [
             f"=====================================",
             f"NOVA NOTIFICAÇÃO - {notification_data.timestamp.strftime('%d/%m/%Y %H:%M:%S')}",
             f"=====================================",
-            f"Palavra-chave: {listing.get('keyword_term', 'N/A')}",
-            f"Cidade: {listing.get('city_name', 'N/A')}",
+            f"Palavra-chave: {notification_data.keyword or 'N/A'}",
+            f"Cidade: {notification_data.city or 'N/A'}",
             f"",
-            f"Título: {listing.get('title', 'Sem título')}",
-            f"Preço: {listing.get('price', 'Não informado')}",
-            f"Localização: {listing.get('location', 'Não informada')}",
+            f"Título: {notification_data.title or 'Sem título'}",
+            f"Preço: {notification_data.price or 'Não informado'}",
+            f"Localização: {notification_data.location or 'Não informada'}",
             f"",
-            f"Link: {listing.get('url', 'N/A')}",
-            f"ID Facebook: {listing.get('facebook_id', 'N/A')}",
+            f"Link: {notification_data.url or 'N/A'}",
+            f"ID Facebook: {notification_data.facebook_id or 'N/A'}",
             f"",
             f""
         ]
         
-        text_content = "\n".join(lines)
-        
-        # Salvar arquivo
-        mode = 'a' if self.append_mode else 'w'
-        with open(self.file_path, mode, encoding='utf-8') as f:
-            f.write(text_content)
-        
-        return {
-            'success': True,
-            'message': f'Notificação salva em {self.file_path}'
-        }
+        return "\n".join(lines)
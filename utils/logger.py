@@ -5,9 +5,19 @@ Integra com o banco de dados e fornece logs coloridos
 
 import logging
 import sys
+import threading
+import time
 from datetime import datetime
 from typing import Dict, Any, Optional
 from enum import Enum
+from functools import lru_cache
+
+# Logger da aplicação: único dono dos handlers; os demais são filhos ("MarketplaceMonitor.CLI")
+_APP_LOGGER_NAME = "MarketplaceMonitor"
+_handlers_lock = threading.Lock()
+
+# Formato das linhas do console (ColoredFormatter tem um caminho rápido para ele)
+_CONSOLE_FORMAT = '%(asctime)s | %(levelname)s | %(message)s'
 
 class LogLevel(Enum):
     DEBUG = "DEBUG"
@@ -16,7 +26,25 @@ class LogLevel(Enum):
     ERROR = "ERROR"
     CRITICAL = "CRITICAL"
 
-class ColoredFormatter(logging.Formatter):
+class CachedTimeFormatter(logging.Formatter):
+    """Formatter que reaproveita o horário formatado enquanto o segundo não muda"""
+    
+    _cached_time = (None, '')  # (segundo, texto formatado)
+    
+    def formatTime(self, record, datefmt=None):
+        # Sem datefmt o formato padrão inclui milissegundos: não dá para cachear
+        datefmt = datefmt or self.datefmt
+        if not datefmt:
+            return super().formatTime(record, datefmt)
+        
+        second = int(record.created)
+        cached_second, cached_text = self._cached_time
+        if second != cached_second:
+            cached_text = time.strftime(datefmt, self.converter(record.created))
+            self._cached_time = (second, cached_text)
+        return cached_text
+
+class ColoredFormatter(CachedTimeFormatter):
     """Formatter que adiciona cores aos logs no terminal"""
     
     # Códigos de cores ANSI
@@ -29,7 +57,24 @@ class ColoredFormatter(logging.Formatter):
         'RESET': '\033[0m'        # Reset
     }
     
+    def __init__(self, fmt=None, datefmt=None, *args, **kwargs):
+        super().__init__(fmt, datefmt, *args, **kwargs)
+        
+        # Nível já colorido e alinhado, para o formato padrão do console
+        reset_color = self.COLORS['RESET']
+        self._level_prefixes = {
+            level: f"{color}{level:<8}{reset_color}"
+            for level, color in self.COLORS.items() if level != 'RESET'
+        }
+        self._fast_path = self._fmt == _CONSOLE_FORMAT
+    
     def format(self, record):
+        # Caminho rápido: formato padrão do console, sem exceção/stack a anexar
+        prefix = self._level_prefixes.get(record.levelname)
+        if (self._fast_path and prefix is not None and
+                not record.exc_info and not record.exc_text and not record.stack_info):
+            return f"{self.formatTime(record)} | {prefix} | {record.getMessage()}"
+        
         # Adicionar cor ao nível
         log_color = self.COLORS.get(record.levelname, self.COLORS['RESET'])
         reset_color = self.COLORS['RESET']
@@ -50,27 +95,33 @@ class ColoredFormatter(logging.Formatter):
         return formatted
 
 class Logger:
-    def __init__(self, name: str = "MarketplaceMonitor", db_manager=None):
+    def __init__(self, name: str = _APP_LOGGER_NAME, db_manager=None):
         self.name = name
         self.db_manager = db_manager
         
-        # Configurar logger do Python
-        self.logger = logging.getLogger(name)
-        self.logger.setLevel(logging.DEBUG)
+        # Configurar logger do Python: handlers e nível ficam no logger da
+        # aplicação, e os loggers nomeados herdam dele
+        self.app_logger = logging.getLogger(_APP_LOGGER_NAME)
+        if name == _APP_LOGGER_NAME:
+            self.logger = self.app_logger
+        else:
+            self.logger = logging.getLogger(f"{_APP_LOGGER_NAME}.{name}")
         
-        # Evitar duplicação de handlers
-        if not self.logger.handlers:
-            self._setup_handlers()
+        # Um único par de handlers, mesmo com várias threads criando loggers
+        with _handlers_lock:
+            if not self.app_logger.handlers:
+                self.app_logger.setLevel(logging.DEBUG)
+                self._setup_handlers()
     
     def _setup_handlers(self):
-        """Configurar handlers de console e arquivo"""
+        """Configurar handlers de console e arquivo (no logger da aplicação)"""
         
         # Handler para console (colorido)
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(logging.INFO)
         
         console_formatter = ColoredFormatter(
-            '%(asctime)s | %(levelname)s | %(message)s',
+            _CONSOLE_FORMAT,
             datefmt='%H:%M:%S'
         )
         console_handler.setFormatter(console_formatter)
@@ -79,15 +130,15 @@ class Logger:
         file_handler = logging.FileHandler('marketplace_monitor.log', encoding='utf-8')
         file_handler.setLevel(logging.DEBUG)
         
-        file_formatter = logging.Formatter(
+        file_formatter = CachedTimeFormatter(
             '%(asctime)s | %(levelname)s | %(name)s | %(funcName)s | %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         file_handler.setFormatter(file_formatter)
         
         # Adicionar handlers
-        self.logger.addHandler(console_handler)
-        self.logger.addHandler(file_handler)
+        self.app_logger.addHandler(console_handler)
+        self.app_logger.addHandler(file_handler)
     
     def _log_to_db(self, level: str, message: str, module: str = None, 
                    function: str = None, details: Dict[str, Any] = None):
@@ -99,35 +150,57 @@ class Logger:
                 # Evitar loop infinito se houver erro no banco
                 print(f"Erro ao salvar log no banco: {e}")
     
-    def debug(self, message: str, module: str = None, function: str = None, 
+    def flush(self):
+        """Gravar no banco os logs ainda no buffer do DatabaseManager"""
+        if self.db_manager:
+            try:
+                self.db_manager.flush_logs()
+            except Exception as e:
+                print(f"Erro ao salvar log no banco: {e}")
+    
+    # Os wrappers aceitam args no estilo % (logger.info("%s novos", n)): o
+    # logging só formata a mensagem se o registro for emitido, e o texto
+    # completo só é montado aqui quando há banco para gravar
+    
+    def debug(self, message: str, *args, module: str = None, function: str = None, 
               details: Dict[str, Any] = None):
         """Log de debug"""
-        self.logger.debug(message)
-        self._log_to_db(LogLevel.DEBUG.value, message, module, function, details)
+        self.logger.debug(message, *args)
+        if self.db_manager:
+            self._log_to_db(LogLevel.DEBUG.value, message % args if args else message,
+                            module, function, details)
     
-    def info(self, message: str, module: str = None, function: str = None, 
+    def info(self, message: str, *args, module: str = None, function: str = None, 
              details: Dict[str, Any] = None):
         """Log de informação"""
-        self.logger.info(message)
-        self._log_to_db(LogLevel.INFO.value, message, module, function, details)
+        self.logger.info(message, *args)
+        if self.db_manager:
+            self._log_to_db(LogLevel.INFO.value, message % args if args else message,
+                            module, function, details)
     
-    def warning(self, message: str, module: str = None, function: str = None, 
+    def warning(self, message: str, *args, module: str = None, function: str = None, 
                 details: Dict[str, Any] = None):
         """Log de aviso"""
-        self.logger.warning(message)
-        self._log_to_db(LogLevel.WARNING.value, message, module, function, details)
+        self.logger.warning(message, *args)
+        if self.db_manager:
+            self._log_to_db(LogLevel.WARNING.value, message % args if args else message,
+                            module, function, details)
     
-    def error(self, message: str, module: str = None, function: str = None, 
+    def error(self, message: str, *args, module: str = None, function: str = None, 
               details: Dict[str, Any] = None):
         """Log de erro"""
-        self.logger.error(message)
-        self._log_to_db(LogLevel.ERROR.value, message, module, function, details)
+        self.logger.error(message, *args)
+        if self.db_manager:
+            self._log_to_db(LogLevel.ERROR.value, message % args if args else message,
+                            module, function, details)
     
-    def critical(self, message: str, module: str = None, function: str = None, 
+    def critical(self, message: str, *args, module: str = None, function: str = None, 
                  details: Dict[str, Any] = None):
         """Log crítico"""
-        self.logger.critical(message)
-        self._log_to_db(LogLevel.CRITICAL.value, message, module, function, details)
+        self.logger.critical(message, *args)
+        if self.db_manager:
+            self._log_to_db(LogLevel.CRITICAL.value, message % args if args else message,
+                            module, function, details)
     
     def log_execution_start(self, operation: str, **kwargs):
         """Log início de operação"""
@@ -136,13 +209,19 @@ class Logger:
             'parameters': kwargs,
             'start_time': datetime.now().isoformat()
         }
-        self.info(f"🚀 Iniciando: {operation}", details=details)
+        self.info("🚀 Iniciando: %s", operation, details=details)
         return details
     
     def log_execution_end(self, operation: str, success: bool, 
                          execution_details: Dict[str, Any] = None, **kwargs):
         """Log fim de operação"""
         status = "✅ Sucesso" if success else "❌ Falha"
+        level_func = self.info if success else self.error
+        
+        # Sem banco os detalhes seriam descartados: não montar o dict
+        if self.db_manager is None:
+            level_func("%s: %s", status, operation)
+            return
         
         details = {
             'operation': operation,
@@ -156,42 +235,44 @@ class Logger:
         if kwargs:
             details.update(kwargs)
         
-        level_func = self.info if success else self.error
-        level_func(f"{status}: {operation}", details=details)
+        level_func("%s: %s", status, operation, details=details)
     
     def log_scraping_result(self, keyword: str, city: str, result: Dict[str, Any]):
         """Log específico para resultados de scraping"""
-        message = (f"🔍 {keyword} em {city}: "
-                  f"{result.get('new_listings', 0)} novos/"
-                  f"{result.get('listings_found', 0)} total "
-                  f"({result.get('execution_time_ms', 0)}ms)")
+        args = (keyword, city, result.get('new_listings', 0),
+                result.get('listings_found', 0), result.get('execution_time_ms', 0))
         
         if result.get('success'):
-            self.info(message, details=result)
+            self.info("🔍 %s em %s: %s novos/%s total (%sms)", *args, details=result)
         else:
-            self.error(f"❌ {message} - {result.get('error_message', 'Erro desconhecido')}", 
-                      details=result)
+            self.error("❌ 🔍 %s em %s: %s novos/%s total (%sms) - %s", *args,
+                       result.get('error_message', 'Erro desconhecido'), details=result)
     
     def log_notification_sent(self, notification_type: str, listing_title: str, 
                              success: bool, error: str = None):
         """Log para notificações enviadas"""
         status = "✅" if success else "❌"
-        message = f"{status} Notificação {notification_type}: {listing_title[:50]}"
         
-        details = {
-            'notification_type': notification_type,
-            'listing_title': listing_title,
-            'success': success,
-            'error': error
-        }
+        # Sem banco os detalhes seriam descartados: não montar o dict
+        if self.db_manager is None:
+            details = None
+        else:
+            details = {
+                'notification_type': notification_type,
+                'listing_title': listing_title,
+                'success': success,
+                'error': error
+            }
         
         if success:
-            self.info(message, details=details)
+            self.info("%s Notificação %s: %s", status, notification_type,
+                      listing_title[:50], details=details)
         else:
-            self.error(f"{message} - {error}", details=details)
+            self.error("%s Notificação %s: %s - %s", status, notification_type,
+                       listing_title[:50], error, details=details)
     
     def set_level(self, level: str):
-        """Definir nível de log"""
+        """Definir nível de log (vale para todos os loggers da aplicação)"""
         level_map = {
             'DEBUG': logging.DEBUG,
             'INFO': logging.INFO,
@@ -201,22 +282,21 @@ class Logger:
         }
         
         if level.upper() in level_map:
-            self.logger.setLevel(level_map[level.upper()])
+            self.app_logger.setLevel(level_map[level.upper()])
             # Atualizar handlers também
-            for handler in self.logger.handlers:
+            for handler in self.app_logger.handlers:
                 if isinstance(handler, logging.StreamHandler) and handler.stream == sys.stdout:
                     handler.setLevel(level_map[level.upper()])
 
-# Instância global do logger
-_global_logger = None
+@lru_cache(maxsize=None)
+def _make_logger(name: str) -> Logger:
+    """Instância única de Logger por nome"""
+    return Logger(name)
 
-def get_logger(name: str = "MarketplaceMonitor", db_manager=None) -> Logger:
+def get_logger(name: str = _APP_LOGGER_NAME, db_manager=None) -> Logger:
     """Obter instância do logger"""
-    global _global_logger
-    
-    if _global_logger is None:
-        _global_logger = Logger(name, db_manager)
-    elif db_manager and not _global_logger.db_manager:
-        _global_logger.db_manager = db_manager
+    logger = _make_logger(name)
+    if db_manager is not None and logger.db_manager is None:
+        logger.db_manager = db_manager
     
-    return _global_logger
+    return logger